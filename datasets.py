@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from ingest import load_dataset
+from query import filter_dataset, most_requested_songs, plot_counts
+
+
+# Load the tabdb/playdb/requestdb triple of every club concurrently, one independent shard per club
+def load_shards(club_paths, required_columns, max_workers=None):
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {club: pool.submit(load_dataset, paths, required_columns) for club, paths in club_paths.items()}
+        shards = {}
+        for club, future in futures.items():
+            try:
+                shards[club] = future.result()
+            except Exception as e:
+                raise ValueError(f"Club {club}: {e}") from e
+    return shards
+
+
+# Add (or replace) the shard of a single club without touching the others
+def add_shard(shards, club, file_paths, required_columns):
+    shards[club] = load_dataset(file_paths, required_columns)
+    return shards[club]
+
+
+# Run a query on every selected shard in parallel, results keyed by club
+def query_shards(shards, query, clubs=None, max_workers=None):
+    clubs = list(shards) if clubs is None else list(clubs)
+    unknown = [club for club in clubs if club not in shards]
+    if unknown:
+        raise KeyError(f"Unknown clubs: {unknown}")
+    # A query for a single club runs directly, so other shards never slow it down
+    if len(clubs) == 1:
+        return {clubs[0]: query(shards[clubs[0]])}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {club: pool.submit(query, shards[club]) for club in clubs}
+        return {club: future.result() for club, future in futures.items()}
+
+
+# Filtered rows of the selected clubs, tagged with the club they come from
+def filter_shards(shards, criteria, clubs=None):
+    results = query_shards(shards, lambda dataset: filter_dataset(dataset, criteria), clubs)
+    frames = [result.assign(club=club) for club, result in results.items()]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+# Most requested songs across clubs, songs matched on their normalized registry key
+def most_requested_across_clubs(shards, top_n=10, clubs=None):
+    results = query_shards(shards, most_requested_songs, clubs)
+    combined = pd.concat(results.values(), ignore_index=True)
+    if combined.empty:
+        return combined
+    totals = combined.groupby('song_key', sort=False).agg(
+        song=('song', 'first'), artist=('artist', 'first'), requests=('requests', 'sum'),
+        clubs=('requests', 'size'),
+    )
+    totals = totals.sort_values('requests', ascending=False, kind='stable').head(top_n)
+    return totals.reset_index(drop=True)
+
+
+# Plot counts of filtered results summed over the selected clubs
+def plot_counts_across_clubs(shards, criteria, plot_type, clubs=None):
+    results = query_shards(shards, lambda dataset: plot_counts(filter_dataset(dataset, criteria), plot_type), clubs)
+    counts = pd.concat(results.values(), axis=1).fillna(0).sum(axis=1)
+    if plot_type in ("decade", "date"):
+        return counts.sort_index()
+    return counts.sort_values(ascending=False, kind='stable')
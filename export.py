@@ -0,0 +1,148 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from join_index import gather, requestdb_rows_for
+from query import enrich_rows
+
+# File extensions and the export format they select
+EXPORT_FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.jsonl': 'jsonl'}
+
+# Rows gathered and written at a time, bounding memory whatever the result size
+DEFAULT_CHUNK_SIZE = 50000
+
+# Internal key columns left out of exports
+INTERNAL_COLUMNS = ['song_id']
+
+# tabdb columns added to each play in a play history export (song and artist come from playdb)
+PLAY_HISTORY_TABDB_COLUMNS = ['year', 'type', 'gender', 'duration', 'language', 'tabber', 'source', 'difficulty']
+
+
+# Export format from the file extension
+def export_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{extension}', use one of {sorted(EXPORT_FORMATS)}")
+    return EXPORT_FORMATS[extension]
+
+
+# Enriched tabdb rows, one bounded chunk at a time.
+# With no rows there is still one empty chunk, so every format writes its header or schema.
+def iter_result_chunks(dataset, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    for start in range(0, max(len(rows), 1), chunk_size):
+        yield enrich_rows(dataset, rows[start:start + chunk_size])
+
+
+# Every play of the selected songs with their tabdb details and who requested them, chunk by chunk
+# (one empty chunk when the songs were never played)
+def iter_play_history_chunks(dataset, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    tabdb = dataset['tabdb']
+    playdb = dataset['playdb']
+    song_ids = tabdb['song_id'].to_numpy()
+    playdb_song_ids = playdb['song_id'].to_numpy()
+
+    # song_id -> tabdb position, so the tabdb details of each play are a gather
+    tabdb_rows = np.full(len(dataset['song_registry']['keys']), -1, dtype=np.int64)
+    tabdb_rows[song_ids[rows]] = rows
+    play_rows = np.flatnonzero(tabdb_rows[playdb_song_ids] >= 0)
+
+    tabdb_columns = [col for col in PLAY_HISTORY_TABDB_COLUMNS if col in tabdb.columns]
+    requested_by = dataset['requestdb']['requested_by'].to_numpy()
+    for start in range(0, max(len(play_rows), 1), chunk_size):
+        chunk_rows = play_rows[start:start + chunk_size]
+        chunk = playdb.iloc[chunk_rows].reset_index(drop=True)
+        details = tabdb_rows[chunk['song_id'].to_numpy()]
+        for col in tabdb_columns:
+            chunk[col] = tabdb[col].array.take(details)  # Keeps the tabdb dtype in every chunk
+        request_rows = requestdb_rows_for(dataset['join_index'], chunk['song_id'].to_numpy(), chunk['date'])
+        chunk['requested_by'] = pd.Series(gather(requested_by, request_rows),
+                                          dtype=dataset['join_index']['value_dtypes']['requested_by'])
+        yield chunk
+
+
+# Arrow schema fixed from the column dtypes, so every chunk is written with the same types
+def parquet_schema(chunk):
+    import pyarrow as pa
+    fields = []
+    for col, dtype in chunk.dtypes.items():
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            fields.append(pa.field(col, pa.timestamp('us')))
+        elif pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+            fields.append(pa.field(col, pa.from_numpy_dtype(dtype)))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+# Write chunks as CSV, yielding the number of rows written so far after each one
+def write_csv(chunks, path):
+    written = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for chunk in chunks:
+            chunk.to_csv(f, header=written == 0, index=False)
+            written += len(chunk)
+            yield written
+
+
+# Write chunks as JSON Lines, one record per line
+def write_jsonl(chunks, path):
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            if len(chunk):
+                f.write(chunk.to_json(orient='records', lines=True, date_format='iso').rstrip('\n') + '\n')
+            written += len(chunk)
+            yield written
+
+
+# Write chunks as row groups of one Parquet file
+def write_parquet(chunks, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet export needs the pyarrow package")
+    written = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                schema = parquet_schema(chunk)
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            written += len(chunk)
+            yield written
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+CHUNK_WRITERS = {'csv': write_csv, 'jsonl': write_jsonl, 'parquet': write_parquet}
+
+
+# Write chunks in the given format, reporting progress as (rows_written, total_rows)
+def write_chunks(chunks, path, fmt, total_rows, progress=None):
+    if fmt not in CHUNK_WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    public_chunks = (chunk.drop(columns=[col for col in INTERNAL_COLUMNS if col in chunk.columns]) for chunk in chunks)
+    written = 0
+    for written in CHUNK_WRITERS[fmt](public_chunks, path):
+        if progress:
+            progress(written, total_rows)
+    return written
+
+
+# Export the selected tabdb rows (or their full play history) in bounded-size chunks
+def export_result(dataset, rows, path, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, play_history=False):
+    fmt = fmt or export_format(path)
+    rows = np.asarray(rows, dtype=np.int64)
+    if play_history:
+        selected = np.zeros(len(dataset['song_registry']['keys']), dtype=bool)
+        selected[dataset['tabdb']['song_id'].to_numpy()[rows]] = True
+        total_rows = int(selected[dataset['playdb']['song_id'].to_numpy()].sum())
+        chunks = iter_play_history_chunks(dataset, rows, chunk_size)
+    else:
+        total_rows = len(rows)
+        chunks = iter_result_chunks(dataset, rows, chunk_size)
+    return write_chunks(chunks, path, fmt, total_rows, progress)
@@ -0,0 +1,260 @@
+import csv
+
+import numpy as np
+import pandas as pd
+
+from join_index import build_join_index
+from song_registry import build_song_registry
+from validation import (DatasetValidationError, build_report, check_date_headers, check_duplicate_plays,
+                        check_orphans, check_parsed, check_request_codes, check_schema)
+
+# Columns tabdb must provide
+REQUIRED_TABDB_COLUMNS = [
+    'song', 'artist', 'year', 'type', 'gender', 'duration',
+    'language', 'tabber', 'source', 'date', 'difficulty', 'specialbooks'
+]
+
+# Declared schema of tabdb: text columns are read as text, numeric columns (None) are typed by the CSV
+# reader itself and only coerced when it could not read them as numbers
+TABDB_SCHEMA = {
+    'song': str, 'artist': str, 'year': None, 'type': str, 'gender': str, 'duration': str,
+    'language': str, 'tabber': str, 'source': str, 'date': None, 'difficulty': None, 'specialbooks': str,
+}
+
+# Identifying columns of the wide playdb/requestdb files, every other column is a yyyymmdd session date
+WIDE_ID_COLUMNS = ['song', 'artist']
+
+# Codes used in requestdb cells
+REQUESTED_BY_CODES = {'G': 'Group', 'A': 'Audience', '?': 'Unknown'}
+
+# Position of each long-format row in its wide file, kept while loading for the validation report
+SOURCE_COLUMNS = ['source_row', 'source_column']
+
+
+# Use the multithreaded pyarrow CSV parser when it is installed
+def csv_engine():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return 'c'
+    return 'pyarrow'
+
+
+# Read CSV columns into a pyarrow Table: text columns as text, the others typed as numbers by the reader
+def read_csv_table(path, columns, text_columns):
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=columns,
+        column_types={col: pa.string() for col in text_columns},
+        strings_can_be_null=True,  # Empty cells are missing, as with pandas
+    )
+    return pa_csv.read_csv(path, convert_options=convert_options)
+
+
+# Read the given CSV columns: text columns as text, the others typed as numbers by the CSV reader.
+# pyarrow's reader is used directly when installed; pandas' own arrow path would re-cast every column.
+def read_csv_columns(path, columns, text_columns):
+    if csv_engine() == 'pyarrow':
+        return read_csv_table(path, columns, text_columns).to_pandas()
+    return pd.read_csv(path, usecols=columns, dtype={col: str for col in text_columns})[columns]
+
+
+# Column names of a CSV file from its first line
+def read_header(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return next(csv.reader(f), [])
+
+
+# Parse yyyymmdd numbers or strings with integer arithmetic, invalid dates become NaT
+def parse_yyyymmdd(values):
+    numbers = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+    numbers = np.where(numbers == np.floor(numbers), numbers, np.nan)  # Reject fractional values
+    parts = pd.DataFrame({
+        'year': numbers // 10000,
+        'month': numbers // 100 % 100,
+        'day': numbers % 100,
+    })
+    return pd.to_datetime(parts, errors='coerce')
+
+
+# Parse "HH:MM:SS" durations into seconds with integer arithmetic, invalid durations become NaN
+def parse_hhmmss(values):
+    parts = pd.Series(values, dtype=object).str.split(':', expand=True)
+    fields = parts.notna().sum(axis=1).to_numpy()
+    parts = parts.reindex(columns=range(3))
+    hours, minutes, seconds = (pd.to_numeric(parts[i], errors='coerce').to_numpy(dtype=float) for i in range(3))
+    return np.where(fields == 3, hours * 3600 + minutes * 60 + seconds, np.nan)
+
+
+# Read tabdb with its declared schema and typed columns, adding cells that fail to parse to `issues`
+def read_tabdb(path, required_columns, issues=None):
+    header = read_header(path)
+    missing_cols = [col for col in required_columns if col not in header]
+    if missing_cols:
+        raise ValueError(f"tabdb.csv missing columns: {missing_cols}")
+
+    usecols = [col for col in header if col in TABDB_SCHEMA]
+    df = read_csv_columns(path, usecols, [col for col in usecols if TABDB_SCHEMA[col] is str])
+
+    parsers = {
+        'date': (parse_yyyymmdd, "unparseable date"),
+        'duration': (parse_hhmmss, "unparseable duration"),
+        'year': (lambda values: pd.to_numeric(values, errors='coerce'), "unparseable year"),
+        'difficulty': (lambda values: pd.to_numeric(values, errors='coerce'), "unparseable difficulty"),
+    }
+    for col, (parse, issue) in parsers.items():
+        if col in df.columns:
+            raw = df[col]
+            df[col] = parse(raw)
+            if issues is not None:
+                issues.append(check_parsed("tabdb.csv", col, raw, df[col], issue))
+    return df
+
+
+# Non-empty cells of the date columns with pyarrow, without converting the wide table to pandas.
+# Numbers stay numbers; if any column holds text, every cell is returned as text.
+def arrow_wide_cells(path, date_columns):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    table = read_csv_table(path, WIDE_ID_COLUMNS + date_columns, WIDE_ID_COLUMNS)
+    ids = {col: table.column(col).to_numpy(zero_copy_only=False) for col in WIDE_ID_COLUMNS}
+    rows, cells = [], []
+    for col in date_columns:
+        column = table.column(col)
+        valid = pc.is_valid(column)
+        rows.append(np.flatnonzero(valid.to_numpy(zero_copy_only=False)))
+        cells.append(pc.filter(column, valid))
+    numeric = all(pa.types.is_integer(c.type) or pa.types.is_floating(c.type) or pa.types.is_null(c.type)
+                  for c in cells)
+    value_type = pa.float64() if numeric else pa.string()
+    chunks = [chunk for cell in cells for chunk in cell.cast(value_type).chunks]
+    values = pa.chunked_array(chunks, type=value_type).to_pandas()
+    return ids, rows, values
+
+
+# Non-empty cells of the date columns with pandas, one column at a time
+def pandas_wide_cells(path, date_columns):
+    wide = pd.read_csv(path, usecols=WIDE_ID_COLUMNS + date_columns, dtype={col: str for col in WIDE_ID_COLUMNS})
+    ids = {col: wide[col].to_numpy() for col in WIDE_ID_COLUMNS}
+    rows, cells = [], []
+    for col in date_columns:
+        present = np.flatnonzero(wide[col].notna().to_numpy())
+        rows.append(present)
+        if len(present):  # Empty columns are skipped, their dtype says nothing about the cells
+            cells.append(wide[col].take(present).reset_index(drop=True))
+    values = pd.concat(cells, ignore_index=True) if cells else pd.Series([], dtype=float)
+    return ids, rows, values
+
+
+# Read a wide file (one column per session date) straight into long format.
+# Cells keep the type the CSV reader gave them (numbers or text), so nothing is re-parsed here.
+def read_wide(path, value_name):
+    header = read_header(path)
+    # Trailing commas produce empty column names that carry no session
+    date_columns = [col for col in header if col and col not in WIDE_ID_COLUMNS]
+    wide_cells = arrow_wide_cells if csv_engine() == 'pyarrow' else pandas_wide_cells
+    ids, rows, values = wide_cells(path, date_columns)
+
+    # Parse the date headers once instead of once per cell
+    header_dates = parse_yyyymmdd(date_columns)
+
+    # Cells column by column, the same order melt + dropna produces
+    row_positions = np.concatenate(rows) if rows else np.array([], dtype=np.int64)
+    column_positions = np.repeat(np.arange(len(date_columns)), [len(r) for r in rows])
+
+    long = pd.DataFrame({
+        'song': ids['song'][row_positions],
+        'artist': ids['artist'][row_positions],
+        'date': header_dates.to_numpy()[column_positions],
+        value_name: values,
+        'source_row': row_positions,
+        'source_column': np.asarray(date_columns, dtype=object)[column_positions],
+    })
+    unparsed = sorted({date_columns[i] for i in column_positions[header_dates.isna().to_numpy()[column_positions]]})
+    return long, unparsed
+
+
+# Read playdb into long format, sorted by date and play order
+def read_playdb(path, issues=None):
+    playdb_long, unparsed = read_wide(path, 'play_order')  # Unparseable session dates stay NaT
+    raw = playdb_long['play_order']
+    if issues is not None:
+        issues.extend(check_date_headers("playdb.csv", unparsed))
+    # Only columns the CSV reader could not type as numbers hold text, so a clean file is not re-parsed
+    if not pd.api.types.is_numeric_dtype(raw.dtype):
+        playdb_long['play_order'] = pd.to_numeric(raw, errors='coerce')
+        if issues is not None:
+            issues.append(check_parsed("playdb.csv", playdb_long['source_column'], raw, playdb_long['play_order'],
+                                       "unparseable play order", rows=playdb_long['source_row']))
+    playdb_long['play_order'] = playdb_long['play_order'].astype('float64')
+    playdb_long = playdb_long.sort_values(by=['date', 'play_order'])
+    playdb_long.reset_index(drop=True, inplace=True)
+    return add_play_order_column(playdb_long)
+
+
+# Read requestdb into long format with readable requester names; unknown codes are kept as they are
+def read_requestdb(path, issues=None):
+    requestdb_long, unparsed = read_wide(path, 'requested_by')  # Unparseable session dates stay NaT
+    if not pd.api.types.is_string_dtype(requestdb_long['requested_by'].dtype):
+        requestdb_long['requested_by'] = requestdb_long['requested_by'].astype(str)  # Numbers read as codes
+    if issues is not None:
+        issues.extend(check_date_headers("requestdb.csv", unparsed))
+        issues.append(check_request_codes("requestdb.csv", requestdb_long['source_row'],
+                                          requestdb_long['source_column'], requestdb_long['requested_by']))
+    requestdb_long['requested_by'] = requestdb_long['requested_by'].replace(REQUESTED_BY_CODES)
+    return requestdb_long
+
+
+# Compute the order of songs played within each session
+def add_play_order_column(playdb):
+    # Sort playdb by 'date' and assign an order of the song played
+    playdb_sorted = playdb.sort_values(by=['date', 'play_order']).copy()
+    playdb_sorted['order_of_song_played'] = playdb_sorted.groupby('date').cumcount() + 1
+    return playdb_sorted
+
+
+# Read the three files of one club and precompute the song registry and join index.
+# Problems in the data are collected in dataset['validation_report'] instead of stopping the load;
+# only missing files or columns raise DatasetValidationError, with the report of all three files.
+def load_dataset(file_paths, required_columns):
+    headers = {}
+    for name, path in file_paths.items():
+        if path:
+            try:
+                headers[name] = read_header(path)
+            except Exception as e:
+                headers[name] = e
+    issues = check_schema(file_paths, headers, required_columns)
+    if issues:
+        raise DatasetValidationError(build_report(issues))
+
+    dataset = {}
+    readers = {
+        'tabdb': lambda path: read_tabdb(path, required_columns, issues),
+        'playdb': lambda path: read_playdb(path, issues),
+        'requestdb': lambda path: read_requestdb(path, issues),
+    }
+    for name, path in file_paths.items():
+        try:
+            # Each file is read with its declared schema and vectorized type parsing
+            dataset[name] = readers[name](path)
+        except Exception as e:
+            raise ValueError(f"Error loading {name}.csv: {e}") from e
+
+    # Give every table compact int32 song keys matched on normalized title and artist
+    registry = build_song_registry(dataset)
+    for name, song_ids in registry['song_ids'].items():
+        dataset[name]['song_id'] = song_ids
+    dataset['song_registry'] = registry
+
+    # Checks across the files, then drop the source positions they needed
+    issues.append(check_duplicate_plays(dataset['playdb']))
+    issues.extend(check_orphans(dataset))
+    for name in ('playdb', 'requestdb'):
+        dataset[name] = dataset[name].drop(columns=SOURCE_COLUMNS)
+    dataset['validation_report'] = build_report(issues)
+
+    # Precompute the (song, date) lookups used to enrich every filtered result
+    dataset['join_index'] = build_join_index(dataset['tabdb'], dataset['playdb'], dataset['requestdb'])
+    return dataset
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+# Columns gathered from the long tables when enriching tabdb rows
+PLAYDB_COLUMNS = ['order_of_song_played']
+REQUESTDB_COLUMNS = ['requested_by']
+
+
+# Combine integer song and date ids into one int64 key, -1 where either id is missing
+def combined_keys(song_ids, date_ids, n_dates):
+    song_ids = np.asarray(song_ids, dtype=np.int64)
+    date_ids = np.asarray(date_ids, dtype=np.int64)
+    return np.where((song_ids >= 0) & (date_ids >= 0), song_ids * n_dates + date_ids, -1)
+
+
+# Sorted unique keys of a table with the row position of their first occurrence
+def key_positions(keys):
+    valid = np.flatnonzero(keys >= 0)
+    unique_keys, first = np.unique(keys[valid], return_index=True)
+    return unique_keys, valid[first]
+
+
+# Row positions for the given keys in a (unique_keys, positions) pair, -1 where absent
+def lookup_positions(table, keys):
+    unique_keys, positions = table
+    if len(unique_keys) == 0:
+        return np.full(len(keys), -1, dtype=np.int64)
+    slots = np.minimum(np.searchsorted(unique_keys, keys), len(unique_keys) - 1)
+    found = (unique_keys[slots] == keys) & (keys >= 0)
+    return np.where(found, positions[slots], -1)
+
+
+# Column dtype of gathered values: integers and booleans become float to hold NaN, others keep their dtype
+def gathered_dtype(dtype):
+    return np.dtype(float) if dtype.kind in 'iub' else dtype
+
+
+# Build the (song_id, date_id) -> row position index once at load time
+def build_join_index(tabdb, playdb, requestdb):
+    song_ids = np.concatenate([tabdb['song_id'], playdb['song_id'], requestdb['song_id']])
+    dates = pd.concat([tabdb['date'], playdb['date'], requestdb['date']], ignore_index=True)
+    date_ids, date_values = pd.factorize(dates)
+    n_dates = max(len(date_values), 1)
+
+    # Split the shared ids back per table
+    bounds = np.cumsum([0, len(tabdb), len(playdb), len(requestdb)])
+    keys = [combined_keys(song_ids[start:end], date_ids[start:end], n_dates)
+            for start, end in zip(bounds[:-1], bounds[1:])]
+
+    playdb_table = key_positions(keys[1])
+    requestdb_table = key_positions(keys[2])
+    return {
+        'dates': pd.Index(date_values),
+        'n_dates': n_dates,
+        'playdb_table': playdb_table,
+        'requestdb_table': requestdb_table,
+        'tabdb_index': tabdb.index,
+        'playdb_rows': lookup_positions(playdb_table, keys[0]),
+        'requestdb_rows': lookup_positions(requestdb_table, keys[0]),
+        'playdb_values': {col: playdb[col].to_numpy() for col in PLAYDB_COLUMNS},
+        'requestdb_values': {col: requestdb[col].to_numpy() for col in REQUESTDB_COLUMNS},
+        'value_dtypes': {**{col: gathered_dtype(playdb[col].dtype) for col in PLAYDB_COLUMNS},
+                         **{col: gathered_dtype(requestdb[col].dtype) for col in REQUESTDB_COLUMNS}},
+    }
+
+
+# Row positions in requestdb for (song_id, date) pairs of another table, -1 where absent
+def requestdb_rows_for(join_index, song_ids, dates):
+    date_ids = join_index['dates'].get_indexer(dates)
+    return lookup_positions(join_index['requestdb_table'], combined_keys(song_ids, date_ids, join_index['n_dates']))
+
+
+# Gather values at row positions, missing positions become NaN.
+# Integer and boolean columns always come back as float, so a column has one dtype whatever the rows.
+def gather(values, rows):
+    found = rows >= 0
+    if values.dtype.kind in 'iub':
+        values = values.astype(float)
+    if len(values) == 0:
+        return np.full(len(rows), np.nan, dtype=values.dtype if values.dtype.kind in 'fO' else float)
+    result = values[np.where(found, rows, 0)]
+    if not found.all():
+        result[~found] = np.nan
+    return result
+
+
+# Row positions in tabdb of the rows of a filtered tabdb (it keeps tabdb's index labels)
+def tabdb_positions(join_index, filtered_tabdb):
+    return join_index['tabdb_index'].get_indexer(filtered_tabdb.index)
+
+
+# Gather tabdb rows plus their play order and requested_by values in one vectorized pass.
+# Columns keep the same dtypes whatever the rows, including no rows at all.
+def enrich_tabdb_rows(join_index, tabdb, positions):
+    positions = np.asarray(positions, dtype=np.int64)
+    enriched = tabdb.take(positions).reset_index(drop=True)
+    playdb_rows = join_index['playdb_rows'][positions]
+    for col, values in join_index['playdb_values'].items():
+        enriched[col] = pd.Series(gather(values, playdb_rows), dtype=join_index['value_dtypes'][col])
+    requestdb_rows = join_index['requestdb_rows'][positions]
+    for col, values in join_index['requestdb_values'].items():
+        enriched[col] = pd.Series(gather(values, requestdb_rows), dtype=join_index['value_dtypes'][col])
+    return enriched
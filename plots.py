@@ -0,0 +1,112 @@
+import pandas as pd
+import seaborn as sns
+
+from query import plot_counts
+from timeseries import (DEFAULT_WINDOW, conversion_rates, rolling_category_counts, rolling_mean, rotation_rates,
+                        session_counts)
+
+# Plot types with their titles, in the order they appear in the application and the PDF
+PLOT_TITLES = {
+    "difficulty": "Histogram of Songs by Difficulty Level",
+    "duration": "Histogram of Songs by Duration (minutes)",
+    "language": "Bar Chart of Songs by Language",
+    "source": "Bar Chart of Songs by Source",
+    "decade": "Bar Chart of Songs by Decade",
+    "date": "Cumulative Songs Played by Date",
+    "gender": "Pie Chart of Songs by Gender",
+}
+
+# Plot types over the play/request sessions, drawn from a session layout
+TIMESERIES_PLOT_TITLES = {
+    "sessions": "Songs Played per Session",
+    "rotation": "Song Rotation and Novelty over Sessions",
+    "conversion": "Request to Play Conversion over Sessions",
+    "language_trend": "Songs Played by Language over Sessions",
+}
+
+
+# Draw one plot type of the filtered data on the given axes
+def draw_plot(ax, filtered, plot_type, title=None, layout=None, categories=None):
+    if plot_type in TIMESERIES_PLOT_TITLES:
+        draw_timeseries_plot(ax, layout, plot_type, categories=categories)
+        ax.set_title(title or TIMESERIES_PLOT_TITLES[plot_type])
+        return
+    if plot_type not in PLOT_TITLES:
+        raise ValueError(f"Unknown plot type: {plot_type}")
+
+    if plot_type == "difficulty":
+        sns.histplot(filtered['difficulty'].dropna(), bins=5, ax=ax)
+        ax.set_xlabel("Difficulty Level")
+        ax.set_ylabel("Count")
+    elif plot_type == "duration":
+        sns.histplot(filtered['duration'].dropna() / 60, kde=True, ax=ax)  # Convert to minutes
+        ax.set_xlabel("Duration (minutes)")
+        ax.set_ylabel("Count")
+    elif plot_type in ("language", "source", "decade"):
+        plot_counts(filtered, plot_type).plot(kind='bar', ax=ax)
+        ax.set_xlabel(plot_type.capitalize())
+        ax.set_ylabel("Count")
+    elif plot_type == "date":
+        plot_counts(filtered, plot_type).cumsum().plot(ax=ax)
+        ax.set_xlabel("Date")
+        ax.set_ylabel("Cumulative Count")
+    elif plot_type == "gender":
+        # Gender values are stripped and capitalized before counting
+        plot_counts(filtered, plot_type).plot(
+            kind='pie',
+            autopct='%1.1f%%',
+            ax=ax,
+            startangle=90,
+            wedgeprops={'linewidth': 1, 'edgecolor': 'white'},
+            textprops={'fontsize': 10}
+        )
+        ax.set_ylabel('')
+        ax.legend(
+            loc='upper left',
+            bbox_to_anchor=(1.0, 0.8),  # Adjust position to avoid overlap
+            title='Gender'
+        )
+    ax.set_title(title or PLOT_TITLES[plot_type])
+
+
+# Label an axis that has nothing to draw because the selected songs were never played
+def draw_no_plays(ax):
+    ax.text(0.5, 0.5, "No plays for the selected songs", ha='center', va='center', transform=ax.transAxes)
+
+
+# Draw one session plot; rolling series cover the last `window` sessions
+def draw_timeseries_plot(ax, layout, plot_type, window=DEFAULT_WINDOW, categories=None):
+    if layout is None:
+        raise ValueError(f"The {plot_type} plot needs the play and request sessions")
+
+    if not len(layout['sessions']):
+        draw_no_plays(ax)
+    elif plot_type == "sessions":
+        counts = session_counts(layout)['plays']
+        counts.plot(ax=ax, alpha=0.4, label="Songs played")
+        average = pd.Series(rolling_mean(counts.to_numpy(), window), index=counts.index)
+        average.plot(ax=ax, label=f"{window}-session average")
+        ax.set_ylabel("Songs")
+    elif plot_type == "rotation":
+        if not len(layout['play_session']):  # Rates over no plays are undefined
+            draw_no_plays(ax)
+        else:
+            rates = rotation_rates(layout, window)[['novelty_rate', 'rotation_rate']] * 100
+            rates.columns = ["First-ever plays", f"Not played in previous {window} sessions"]
+            rates.plot(ax=ax)
+        ax.set_ylabel("Share of plays (%)")
+    elif plot_type == "conversion":
+        (conversion_rates(layout, window)['conversion_rate'] * 100).plot(ax=ax, label="Requested songs played")
+        ax.set_ylabel("Conversion (%)")
+    elif plot_type == "language_trend":
+        if categories is None:
+            raise ValueError("The language trend plot needs the song languages")
+        counts = rolling_category_counts(layout, *categories, window=window)
+        if counts.columns.empty:  # Only categories with plays get a column
+            draw_no_plays(ax)
+        else:
+            counts.plot(ax=ax)
+        ax.set_ylabel(f"Plays in previous {window} sessions")
+    ax.set_xlabel("Session")
+    if ax.get_legend_handles_labels()[0]:
+        ax.legend(loc='upper left')
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from join_index import enrich_tabdb_rows
+
+# Categorical criteria and the tabdb column each one filters
+CATEGORICAL_CRITERIA = {
+    'languages': 'language',
+    'genders': 'gender',
+    'tabbers': 'tabber',
+    'sources': 'source',
+}
+
+
+# Row positions of the tabdb rows matching the criteria
+def select_rows(dataset, criteria):
+    tabdb = dataset['tabdb']
+    mask = np.ones(len(tabdb), dtype=bool)
+
+    if criteria.get('year_range'):
+        start_year, end_year = criteria['year_range']
+        mask &= ((tabdb['year'] >= start_year) & (tabdb['year'] <= end_year)).to_numpy()
+    if criteria.get('difficulty_range'):
+        min_diff, max_diff = criteria['difficulty_range']
+        mask &= ((tabdb['difficulty'] >= min_diff) & (tabdb['difficulty'] <= max_diff)).to_numpy()
+    if criteria.get('date_range'):
+        start_date, end_date = map(pd.to_datetime, criteria['date_range'])
+        mask &= ((tabdb['date'] >= start_date) & (tabdb['date'] <= end_date)).to_numpy()
+
+    for key, column in CATEGORICAL_CRITERIA.items():
+        if criteria.get(key):
+            mask &= tabdb[column].isin(criteria[key]).to_numpy()
+    if criteria.get('type'):
+        mask &= (tabdb['type'] == criteria['type']).to_numpy()
+    return np.flatnonzero(mask)
+
+
+# Row positions of the matching tabdb rows, newest dates first
+def filtered_row_ids(dataset, criteria):
+    rows = select_rows(dataset, criteria)
+    if 'date' in dataset['tabdb'].columns:
+        dates = dataset['tabdb']['date'].iloc[rows].reset_index(drop=True)
+        rows = rows[dates.sort_values(ascending=False).index.to_numpy()]
+    return rows
+
+
+# Tabdb rows at the given positions with play order and requested_by
+def enrich_rows(dataset, rows):
+    return enrich_tabdb_rows(dataset['join_index'], dataset['tabdb'], rows)
+
+
+# Filtered tabdb rows with play order and requested_by, newest dates first
+def filter_dataset(dataset, criteria):
+    return enrich_rows(dataset, filtered_row_ids(dataset, criteria))
+
+
+# Number of requests per song, most requested first
+def most_requested_songs(dataset, top_n=None):
+    registry = dataset['song_registry']
+    counts = np.bincount(dataset['requestdb']['song_id'].to_numpy(), minlength=len(registry['keys']))
+    order = np.argsort(-counts, kind='stable')
+    order = order[counts[order] > 0][:top_n]
+    return pd.DataFrame({
+        'song_key': registry['keys'][order],
+        'song': registry['songs'][order],
+        'artist': registry['artists'][order],
+        'requests': counts[order],
+    })
+
+
+# Counts behind the bar and pie plots of a filtered result
+def plot_counts(filtered, plot_type):
+    if plot_type == "decade":
+        return ((filtered['year'] // 10) * 10).value_counts().sort_index()
+    if plot_type == "gender":
+        return filtered['gender'].str.strip().str.capitalize().value_counts()
+    if plot_type == "date":
+        return filtered['date'].value_counts().sort_index()
+    return filtered[plot_type].value_counts()
@@ -0,0 +1,392 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import parse_qs, urlsplit
+
+import matplotlib
+matplotlib.use('Agg')  # Charts are rendered off screen, no Tk needed
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import pandas as pd
+
+import shared_data
+from ingest import REQUIRED_TABDB_COLUMNS, load_dataset
+from plots import PLOT_TITLES, TIMESERIES_PLOT_TITLES, draw_plot
+from query import CATEGORICAL_CRITERIA, filter_dataset, most_requested_songs, plot_counts
+from song_registry import song_id_of
+from table_sort import new_sort_cache, sort_permutation
+from timeseries import restrict_layout, session_layout, song_categories
+from transition_graph import transition_graph, typical_position, what_follows
+
+# The server only listens on the local machine unless told otherwise
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Limits on the work the server takes on at once
+MAX_WORKERS = 4  # Threads running filter, sort and stats jobs
+# Processes rendering charts, one per core up to 4. With 0 (the default on a single core, where processes
+# gain nothing) charts render in the threads above and take turns on their GIL.
+CHART_PROCESSES = min(4, os.cpu_count() or 1) if (os.cpu_count() or 1) > 1 else 0
+MAX_CONCURRENT_JOBS = 8  # Jobs handed to the worker pool at the same time
+MAX_PENDING_REQUESTS = 64  # Requests beyond this are turned away with 503
+REQUEST_TIMEOUT = 10  # Seconds allowed for reading a request
+
+# Cached responses and filtered results (least recently used are dropped first)
+RESPONSE_CACHE_SIZE = 256
+RESULT_CACHE_SIZE = 32
+
+# Rows returned by /filter when no limit is given
+DEFAULT_PAGE_SIZE = 100
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+# Raised for malformed query parameters, answered with 400
+class QueryError(ValueError):
+    pass
+
+
+# What the request handlers use: the dataset and a result cache shared by the threads running them
+def handler_state(dataset):
+    return {'dataset': dataset, 'results': OrderedDict(), 'results_lock': threading.Lock()}
+
+
+# Everything the server shares between requests.
+# Chart processes attach one shared memory copy of the tables, published here (see shared_data).
+def create_server_state(dataset, max_workers=MAX_WORKERS, max_concurrent_jobs=MAX_CONCURRENT_JOBS,
+                        max_pending_requests=MAX_PENDING_REQUESTS, chart_processes=CHART_PROCESSES):
+    shared, charts = None, None
+    if chart_processes:
+        shared = shared_data.publish_dataset(dataset)
+        # Spawned, not forked: the parent runs an event loop and worker threads
+        charts = ProcessPoolExecutor(max_workers=chart_processes, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=shared_data.init_worker, initargs=(shared['manifest'], True))
+        # Start every process now, not while the first charts wait for them
+        for _ in range(chart_processes):
+            charts.submit(int)
+    return {
+        **handler_state(dataset),
+        'executor': ThreadPoolExecutor(max_workers=max_workers),
+        'shared': shared,
+        'charts': charts,
+        'jobs': asyncio.Semaphore(max_concurrent_jobs),
+        'max_pending_requests': max_pending_requests,
+        'pending': 0,
+        'responses': OrderedDict(),
+        'inflight': {},
+    }
+
+
+# Stop the worker pools and free the shared tables
+def close_server_state(state):
+    state['executor'].shutdown(wait=False)
+    if state['charts'] is not None:
+        state['charts'].shutdown(wait=True)
+        shared_data.release_segments(state['shared']['segments'], unlink=True)
+
+
+# Put a value in a bounded LRU cache
+def cache_put(cache, key, value, size):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+
+# Parse a "min,max" parameter with the given converter
+def parse_range(params, name, convert):
+    if name not in params:
+        return None
+    try:
+        low, high = params[name][0].split(',')
+        return convert(low.strip()), convert(high.strip())
+    except ValueError:
+        raise QueryError(f"Invalid {name}, expected min,max")
+
+
+# Date text checked to parse, kept as text so criteria stay JSON cache keys
+def parse_date(text):
+    if pd.isna(pd.to_datetime(text)):
+        raise ValueError(f"Not a date: {text}")
+    return text
+
+
+# Filter criteria from query parameters; categorical values are given as repeated parameters.
+# Every parameter is parsed here, so malformed ones are answered with 400 before any filtering.
+def parse_criteria(params):
+    criteria = {
+        'year_range': parse_range(params, 'year_range', int),
+        'difficulty_range': parse_range(params, 'difficulty_range', float),
+        'date_range': parse_range(params, 'date_range', parse_date),
+    }
+    for key in CATEGORICAL_CRITERIA:
+        criteria[key] = params.get(key)
+    criteria['type'] = params.get('type', [None])[0]
+    return {key: value for key, value in criteria.items() if value}
+
+
+# Integer query parameter with a default
+def parse_int(params, name, default):
+    try:
+        return int(params[name][0]) if name in params else default
+    except ValueError:
+        raise QueryError(f"Invalid {name}, expected an integer")
+
+
+# Filtered result and its sort cache, shared by every request with the same criteria.
+# The cache is only touched under the state lock; filtering itself runs outside it, and when two threads
+# filter the same criteria at once the first result stored is the one both use.
+def filtered_result(state, criteria):
+    key = json.dumps(criteria, sort_keys=True)
+    with state['results_lock']:
+        result = state['results'].get(key)
+        if result is not None:
+            state['results'].move_to_end(key)
+            return result
+    result = new_sort_cache(filter_dataset(state['dataset'], criteria).reset_index(drop=True))
+    result['lock'] = threading.Lock()  # Guards the ranks and permutations the sort cache fills lazily
+    with state['results_lock']:
+        if key in state['results']:
+            return state['results'][key]
+        cache_put(state['results'], key, result, RESULT_CACHE_SIZE)
+    return result
+
+
+# /filter: filtered rows, optionally sorted by several columns, one page at a time
+def handle_filter(state, params):
+    result = filtered_result(state, parse_criteria(params))
+    frame = result['frame']
+    keys = [key for key in params.get('sort', [''])[0].split(',') if key]
+    unknown = [key for key in keys if key not in frame.columns]
+    if unknown:
+        raise QueryError(f"Unknown sort columns: {unknown}")
+    if keys:
+        ascending = params.get('order', ['asc'])[0] != 'desc'
+        with result['lock']:
+            permutation = sort_permutation(result, keys, ascending=ascending)
+        frame = frame.iloc[permutation]
+
+    offset = parse_int(params, 'offset', 0)
+    limit = parse_int(params, 'limit', DEFAULT_PAGE_SIZE)
+    page = frame.iloc[offset:offset + limit]
+    rows = page.to_json(orient='records', date_format='iso')
+    body = f'{{"total": {len(frame)}, "offset": {offset}, "rows": {rows}}}'
+    return 200, 'application/json', body.encode('utf-8')
+
+
+# /stats: most requested songs, the counts behind a plot, or what usually follows a song and where it is played
+def handle_stats(state, params):
+    kind = params.get('kind', ['most_requested'])[0]
+    if kind == 'most_requested':
+        top = most_requested_songs(state['dataset'], parse_int(params, 'top_n', 10))
+        body = top.drop(columns=['song_key']).to_json(orient='records')
+    elif kind == 'counts':
+        plot_type = params.get('plot', [''])[0]
+        if plot_type not in ("language", "source", "decade", "gender", "date"):
+            raise QueryError(f"Unknown counts plot: {plot_type}")
+        counts = plot_counts(filtered_result(state, parse_criteria(params))['frame'], plot_type)
+        counts.index = counts.index.astype(str)
+        body = counts.to_json()
+    elif kind == 'follows':
+        song, artist = params.get('song', [''])[0], params.get('artist', [''])[0]
+        song_id = song_id_of(state['dataset']['song_registry'], song, artist)
+        if song_id < 0:
+            raise QueryError(f"Unknown song: {song} by {artist}")
+        with state['results_lock']:  # Built once on first use, then shared by every thread
+            graph = transition_graph(state['dataset'])
+        follows = what_follows(graph, song_id, state['dataset']['song_registry'])
+        position = pd.Series(typical_position(graph, song_id), dtype=object).to_json()  # NaN as null
+        body = f'{{"song_id": {song_id}, "position": {position}, "follows": {follows.to_json(orient="records")}}}'
+    else:
+        raise QueryError(f"Unknown stats kind: {kind}")
+    return 200, 'application/json', body.encode('utf-8')
+
+
+# /chart.png: one plot of the filtered data rendered to PNG
+def handle_chart(state, params):
+    plot_type = params.get('plot', [''])[0]
+    if plot_type not in PLOT_TITLES and plot_type not in TIMESERIES_PLOT_TITLES:
+        raise QueryError(f"Unknown plot type: {plot_type}")
+    frame = filtered_result(state, parse_criteria(params))['frame']
+
+    # Figures are built without pyplot, so no global figure state is shared between jobs
+    fig = Figure(figsize=(9, 7))
+    ax = fig.subplots()
+    if plot_type in TIMESERIES_PLOT_TITLES:
+        dataset = state['dataset']
+        layout = restrict_layout(session_layout(dataset), frame['song_id'].to_numpy())
+        draw_plot(ax, frame, plot_type, layout=layout, categories=song_categories(dataset, 'language'))
+    else:
+        draw_plot(ax, frame, plot_type)
+    fig.tight_layout()
+    buffer = BytesIO()
+    FigureCanvasAgg(fig).print_png(buffer)
+    return 200, 'image/png', buffer.getvalue()
+
+
+ROUTES = {
+    '/filter': handle_filter,
+    '/sort': handle_filter,  # Same handler, the sort and order parameters pick the ordering
+    '/stats': handle_stats,
+    '/chart.png': handle_chart,
+}
+
+# Routes whose jobs run in the chart processes: rendering holds the GIL, so threads would take turns
+PROCESS_ROUTES = {'/chart.png'}
+
+
+# JSON error body
+def error_response(status, message):
+    return status, 'application/json', json.dumps({'error': message}).encode('utf-8')
+
+
+# Run one routed request in the worker pool
+def run_handler(handler, state, params):
+    try:
+        return handler(state, params)
+    except QueryError as e:
+        return error_response(400, str(e))
+
+
+# Server state of a chart process: the shared dataset attached by shared_data.init_worker, its own result cache
+worker_state = None
+
+
+# Run one routed request in a chart process
+def run_worker_handler(path, params):
+    global worker_state
+    if worker_state is None:
+        worker_state = handler_state(shared_data.worker_data)
+    return run_handler(ROUTES[path], worker_state, params)
+
+
+# Answer a request from the cache, an identical request in flight, or the worker pool
+async def dispatch(state, path, params):
+    handler = ROUTES.get(path)
+    if handler is None:
+        return error_response(404, f"Unknown path: {path}")
+
+    key = (path, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+    if key in state['responses']:
+        state['responses'].move_to_end(key)
+        return state['responses'][key]
+    if key in state['inflight']:
+        return await asyncio.shield(state['inflight'][key])
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    state['inflight'][key] = future
+    try:
+        async with state['jobs']:
+            if path in PROCESS_ROUTES and state['charts'] is not None:
+                response = await loop.run_in_executor(state['charts'], run_worker_handler, path, params)
+            else:
+                response = await loop.run_in_executor(state['executor'], run_handler, handler, state, params)
+    except Exception as e:
+        response = error_response(500, f"Internal error: {e}")
+    if response[0] == 200:
+        cache_put(state['responses'], key, response, RESPONSE_CACHE_SIZE)
+    future.set_result(response)
+    del state['inflight'][key]
+    return response
+
+
+# Read the request line and headers of one HTTP request
+async def read_request(reader):
+    request_line = await reader.readline()
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+    return request_line.decode('latin-1').split()
+
+
+# Write a complete HTTP response and close the connection
+async def write_response(writer, status, content_type, body, head=False):
+    headers = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+               f"Content-Type: {content_type}\r\n"
+               f"Content-Length: {len(body)}\r\n"
+               "Connection: close\r\n\r\n")
+    writer.write(headers.encode('latin-1'))
+    if not head:
+        writer.write(body)
+    await writer.drain()
+    writer.close()
+
+
+# Serve one client connection
+async def handle_connection(state, reader, writer):
+    state['pending'] += 1
+    try:
+        try:
+            parts = await asyncio.wait_for(read_request(reader), REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            writer.close()
+            return
+        if len(parts) < 2:
+            await write_response(writer, *error_response(400, "Malformed request line"))
+            return
+        method, target = parts[0], parts[1]
+        if method not in ('GET', 'HEAD'):
+            await write_response(writer, *error_response(405, f"Method not allowed: {method}"))
+            return
+        if state['pending'] > state['max_pending_requests']:
+            await write_response(writer, *error_response(503, "Server busy, try again later"))
+            return
+
+        url = urlsplit(target)
+        if url.path == '/health':
+            response = 200, 'application/json', b'{"status": "ok"}'
+        else:
+            response = await dispatch(state, url.path, parse_qs(url.query))
+        await write_response(writer, *response, head=method == 'HEAD')
+    except ConnectionError:
+        pass
+    finally:
+        state['pending'] -= 1
+
+
+# Start serving a loaded dataset, returns the asyncio server and its shared state
+async def start_server(dataset, host=DEFAULT_HOST, port=DEFAULT_PORT, **limits):
+    state = create_server_state(dataset, **limits)
+    server = await asyncio.start_server(lambda reader, writer: handle_connection(state, reader, writer), host, port)
+    return server, state
+
+
+# Load the data once and serve it until interrupted
+async def serve(file_paths, host, port):
+    dataset = load_dataset(file_paths, REQUIRED_TABDB_COLUMNS)
+    server, state = await start_server(dataset, host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving Ukulele Tuesday data on http://{address[0]}:{address[1]}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        close_server_state(state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Ukulele Tuesday data over local HTTP/JSON")
+    parser.add_argument('--tabdb', required=True, help="Path of the tabbed songs CSV")
+    parser.add_argument('--playdb', required=True, help="Path of the songs played CSV")
+    parser.add_argument('--requestdb', required=True, help="Path of the requested songs CSV")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    file_paths = {'tabdb': args.tabdb, 'playdb': args.playdb, 'requestdb': args.requestdb}
+    try:
+        asyncio.run(serve(file_paths, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
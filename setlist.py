@@ -0,0 +1,201 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Default difficulty curve across the evening: warm up easy, peak in the middle, wind down
+DEFAULT_DIFFICULTY_CURVE = (2.0, 3.0, 2.0)
+
+# Weights of the individual terms of the setlist objective
+REQUEST_WEIGHT = 1.0
+PLAY_PENALTY_WEIGHT = 1.0
+DIFFICULTY_WEIGHT = 1.0
+DURATION_WEIGHT = 0.5  # Per minute of deviation from the target total duration
+ALTERNATIVE_PENALTY = 0.75  # Pushes each alternative away from the songs of earlier ones
+
+# Number of improvement passes after the greedy construction
+IMPROVEMENT_PASSES = 3
+
+# Slack on share x song count products before they are rounded to whole songs
+SHARE_TOLERANCE = 1e-9
+
+
+# Spread the difficulty curve over the positions of the setlist
+def difficulty_targets(curve, n_songs):
+    curve = np.asarray(curve, dtype=float)
+    if len(curve) == 1:
+        return np.full(n_songs, curve[0])
+    return np.interp(np.linspace(0, 1, n_songs), np.linspace(0, 1, len(curve)), curve)
+
+
+# Sum of exponentially decayed events per song, newer events weigh more
+def recency_weights(events, songs, as_of, half_life_days):
+    if events is None or events.empty:
+        return np.zeros(len(songs))
+    age_days = (as_of - events['date']).dt.days.to_numpy(dtype=float)
+    weights = np.where(age_days >= 0, 0.5 ** (age_days / half_life_days), 0.0)
+    per_song = np.bincount(events['song_id'].to_numpy(), weights=weights, minlength=songs.max() + 1)
+    return per_song[songs]
+
+
+# Base score of every song: recently requested songs are preferred, recently played ones penalized
+def score_songs(tabdb, playdb, requestdb, as_of=None, half_life_days=56):
+    if as_of is None:
+        dates = [df['date'].max() for df in (playdb, requestdb) if df is not None and not df.empty]
+        as_of = max(dates) if dates else pd.Timestamp.today()
+    songs = tabdb['song_id'].to_numpy()
+    requested = recency_weights(requestdb, songs, as_of, half_life_days)
+    played = recency_weights(playdb, songs, as_of, half_life_days)
+    return REQUEST_WEIGHT * requested - PLAY_PENALTY_WEIGHT * played
+
+
+# Translate a {value: (min_share, max_share)} mix into per-code count bounds
+def mix_bounds(values, mix, n_songs):
+    codes, uniques = pd.factorize(values)
+    lower = np.zeros(len(uniques) + 1, dtype=int)
+    upper = np.full(len(uniques) + 1, n_songs, dtype=int)
+    codes = np.where(codes < 0, len(uniques), codes)  # Missing values get their own code
+    for value, (min_share, max_share) in (mix or {}).items():
+        matches = np.flatnonzero(uniques == value)
+        if len(matches) == 0:
+            if min_share:
+                raise ValueError(f"No songs available for required mix value '{value}'")
+            continue
+        # The tolerance keeps exact shares such as 0.3 of 10 songs from rounding past each other
+        lower[matches[0]] = math.ceil(min_share * n_songs - SHARE_TOLERANCE)
+        upper[matches[0]] = math.floor(max_share * n_songs + SHARE_TOLERANCE)
+        if lower[matches[0]] > upper[matches[0]]:
+            raise ValueError(f"Mix for '{value}' allows no whole number of songs in a setlist of {n_songs}: "
+                             f"between {min_share:.0%} and {max_share:.0%} of it")
+    if lower.sum() > n_songs:
+        raise ValueError("Mix constraints require more songs than the setlist holds")
+    if upper[np.bincount(codes, minlength=len(upper)) > 0].sum() < n_songs:  # Only values some song has
+        raise ValueError("Mix constraints allow fewer songs than the setlist holds")
+    return codes, lower, upper
+
+
+# Objective of a complete setlist (higher is better)
+def setlist_objective(picks, scores, difficulty, duration, targets, target_duration):
+    total = scores[picks].sum()
+    total -= DIFFICULTY_WEIGHT * np.abs(difficulty[picks] - targets).sum()
+    total -= DURATION_WEIGHT * abs(duration[picks].sum() - target_duration) / 60
+    return total
+
+
+# Mask of candidates that can still be placed without breaking any mix constraint
+def feasible_mask(constraints, counts, slots_left):
+    mask = True
+    for (codes, lower, upper), count in zip(constraints, counts):
+        mask = mask & (count[codes] < upper[codes])
+        # Once the open slots are all needed for minimum quotas, only those codes qualify
+        missing = np.maximum(lower - count, 0)
+        if missing.sum() >= slots_left:
+            mask = mask & (missing[codes] > 0)
+    return mask
+
+
+# Greedy construction: fill each position with the best feasible song for its target
+def build_greedy(scores, difficulty, duration, targets, target_duration, constraints, excluded):
+    n_songs = len(targets)
+    used = excluded.copy()
+    counts = [np.zeros(len(lower), dtype=int) for _, lower, _ in constraints]
+    picks = np.empty(n_songs, dtype=int)
+    remaining = target_duration
+    for position in range(n_songs):
+        slots_left = n_songs - position
+        slot_duration = remaining / slots_left
+        value = (scores
+                 - DIFFICULTY_WEIGHT * np.abs(difficulty - targets[position])
+                 - DURATION_WEIGHT * np.abs(duration - slot_duration) / 60)
+        mask = ~used & feasible_mask(constraints, counts, slots_left)
+        if not mask.any():
+            raise ValueError("Not enough songs satisfy the setlist constraints")
+        best = np.flatnonzero(mask)[np.argmax(value[mask])]
+        picks[position] = best
+        used[best] = True
+        remaining -= duration[best]
+        for (codes, _, _), count in zip(constraints, counts):
+            count[codes[best]] += 1
+    return picks
+
+
+# Local search: replace single positions whenever that improves the whole setlist
+def improve_setlist(picks, scores, difficulty, duration, targets, target_duration, constraints, excluded):
+    used = excluded.copy()
+    used[picks] = True
+    counts = [np.bincount(codes[picks], minlength=len(lower)) for codes, lower, _ in constraints]
+    for _ in range(IMPROVEMENT_PASSES):
+        improved = False
+        for position in range(len(picks)):
+            current = picks[position]
+            rest_duration = duration[picks].sum() - duration[current]
+            gain = (scores - scores[current]
+                    - DIFFICULTY_WEIGHT * (np.abs(difficulty - targets[position])
+                                           - abs(difficulty[current] - targets[position]))
+                    - DURATION_WEIGHT * (np.abs(rest_duration + duration - target_duration)
+                                         - abs(rest_duration + duration[current] - target_duration)) / 60)
+            mask = ~used
+            for (codes, lower, upper), count in zip(constraints, counts):
+                changed = codes != codes[current]
+                mask &= ~changed | ((count[codes] + 1 <= upper[codes])
+                                    & (count[codes[current]] - 1 >= lower[codes[current]]))
+            if not mask.any():
+                continue
+            best = np.flatnonzero(mask)[np.argmax(gain[mask])]
+            if gain[best] <= 1e-9:
+                continue
+            picks[position] = best
+            used[current] = False
+            used[best] = True
+            for (codes, _, _), count in zip(constraints, counts):
+                count[codes[current]] -= 1
+                count[codes[best]] += 1
+            improved = True
+        if not improved:
+            break
+    return picks
+
+
+# Generate ranked setlists of n_songs from tabdb, best first
+def generate_setlist(tabdb, playdb, requestdb, n_songs, target_duration, difficulty_curve=DEFAULT_DIFFICULTY_CURVE,
+                     language_mix=None, gender_mix=None, as_of=None, n_alternatives=3):
+    candidates = tabdb.dropna(subset=['duration', 'difficulty']).reset_index(drop=True)
+    if n_songs <= 0:
+        raise ValueError("The setlist must contain at least one song")
+    if len(candidates) < n_songs:
+        raise ValueError(f"Only {len(candidates)} songs have a duration and difficulty, {n_songs} requested")
+
+    scores = score_songs(candidates, playdb, requestdb, as_of=as_of)
+    difficulty = candidates['difficulty'].to_numpy(dtype=float)
+    duration = candidates['duration'].to_numpy(dtype=float)
+    targets = difficulty_targets(difficulty_curve, n_songs)
+
+    constraints = []
+    if language_mix:
+        constraints.append(mix_bounds(candidates['language'].to_numpy(), language_mix, n_songs))
+    if gender_mix:
+        constraints.append(mix_bounds(candidates['gender'].to_numpy(), gender_mix, n_songs))
+
+    results = []
+    seen = set()
+    penalty = np.zeros(len(candidates))
+    excluded = np.zeros(len(candidates), dtype=bool)
+    for _ in range(max(n_alternatives, 1)):
+        penalized = scores - penalty
+        picks = build_greedy(penalized, difficulty, duration, targets, target_duration, constraints, excluded)
+        picks = improve_setlist(picks, penalized, difficulty, duration, targets, target_duration, constraints, excluded)
+        penalty[picks] += ALTERNATIVE_PENALTY
+        key = tuple(picks)
+        if key in seen:
+            continue
+        seen.add(key)
+        objective = setlist_objective(picks, scores, difficulty, duration, targets, target_duration)
+        setlist = candidates.iloc[picks][['song', 'artist', 'difficulty', 'duration', 'language', 'gender']].copy()
+        setlist.insert(0, 'position', np.arange(1, n_songs + 1))
+        setlist['target_difficulty'] = targets.round(2)
+        setlist.reset_index(drop=True, inplace=True)
+        results.append((objective, setlist))
+
+    # Rank alternatives by their unpenalized objective
+    results.sort(key=lambda result: result[0], reverse=True)
+    return results
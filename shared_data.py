@@ -0,0 +1,148 @@
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from join_index import build_join_index
+
+# Tables published to shared memory
+SHARED_TABLES = ['tabdb', 'playdb', 'requestdb']
+
+# Dataset attached by a pool worker in init_worker, used by the jobs it runs
+worker_data = None
+worker_segments = []
+
+
+# Integer dtype pandas uses for categorical codes with this many categories, so codes are not copied
+def codes_dtype(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+# Copy an array into a new shared memory segment
+def publish_array(array, segments):
+    segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    segments.append(segment)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+    return {'name': segment.name, 'dtype': array.dtype.str, 'shape': array.shape}
+
+
+# Shared memory description of one column: numbers and dates as-is, text as categorical codes
+def publish_column(series, segments):
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        values = series.to_numpy()
+        return {'kind': 'datetime', 'unit': str(values.dtype), 'array': publish_array(values.view(np.int64), segments)}
+    if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+        return {'kind': 'numeric', 'array': publish_array(series.to_numpy(), segments)}
+    codes, categories = pd.factorize(series)
+    return {'kind': 'categorical', 'categories': list(categories), 'dtype': series.dtype,
+            'array': publish_array(codes.astype(codes_dtype(len(categories))), segments)}
+
+
+# Publish the dataset tables once; returns the picklable manifest and the segments owned by this process
+def publish_dataset(dataset, tables=SHARED_TABLES):
+    segments = []
+    try:
+        manifest = {'tables': {}}
+        for name in tables:
+            df = dataset[name]
+            manifest['tables'][name] = {col: publish_column(df[col], segments) for col in df.columns}
+        registry = dataset.get('song_registry')
+        if registry is not None:
+            manifest['song_registry'] = {key: list(registry[key]) for key in ('keys', 'songs', 'artists')}
+    except Exception:
+        release_segments(segments, unlink=True)
+        raise
+    # Never leave segments behind, even if the owner forgets to release them
+    atexit.register(release_segments, segments, True)
+    return {'manifest': manifest, 'segments': segments}
+
+
+# Close (and for the owner, unlink) shared memory segments
+def release_segments(segments, unlink=False):
+    while segments:
+        segment = segments.pop()
+        try:
+            segment.close()
+        except BufferError:
+            pass  # Arrays still viewing the segment keep it mapped until they are gone
+        if unlink:
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# Open an existing segment; only the publishing process unlinks it
+def open_segment(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # Pool workers share the publisher's resource tracker, which already knows the segment
+        return shared_memory.SharedMemory(name=name)
+
+
+# Read-only array view on a shared segment
+def attach_array(spec, segments):
+    segment = open_segment(spec['name'])
+    segments.append(segment)
+    array = np.ndarray(spec['shape'], dtype=np.dtype(spec['dtype']), buffer=segment.buf)
+    array.flags.writeable = False
+    return array
+
+
+# Rebuild the dataset from the manifest; columns are views on the shared segments, not copies.
+# With decode_text, text columns are copied back to their published dtype instead of staying categorical,
+# for code that relies on plain text columns; numbers and dates stay shared.
+def attach_dataset(manifest, build_indexes=True, decode_text=False):
+    segments = []
+    dataset = {}
+    for name, columns in manifest['tables'].items():
+        values = {}
+        for col, spec in columns.items():
+            array = attach_array(spec['array'], segments)
+            if spec['kind'] == 'datetime':
+                values[col] = array.view(spec['unit'])
+            elif spec['kind'] == 'categorical':
+                values[col] = pd.Categorical.from_codes(array, categories=spec['categories'])
+                if decode_text:
+                    values[col] = pd.Series(values[col]).astype(spec['dtype']).array
+            else:
+                values[col] = array
+        dataset[name] = pd.DataFrame(values, copy=False)
+    if 'song_registry' in manifest:
+        dataset['song_registry'] = {key: np.asarray(values, dtype=object)
+                                    for key, values in manifest['song_registry'].items()}
+    if build_indexes and all(name in dataset for name in SHARED_TABLES):
+        dataset['join_index'] = build_join_index(dataset['tabdb'], dataset['playdb'], dataset['requestdb'])
+    return dataset, segments
+
+
+# Publish a dataset for the duration of a with block, unlinking the segments afterwards
+@contextmanager
+def shared_dataset(dataset, tables=SHARED_TABLES):
+    shared = publish_dataset(dataset, tables)
+    try:
+        yield shared
+    finally:
+        release_segments(shared['segments'], unlink=True)
+
+
+# Pool initializer: attach the shared dataset once per worker process
+def init_worker(manifest, decode_text=False):
+    global worker_data
+    worker_data, segments = attach_dataset(manifest, decode_text=decode_text)
+    worker_segments.extend(segments)
+    atexit.register(release_segments, worker_segments)
+
+
+# Run function(item) for every item in worker processes that share one copy of the data
+def run_in_workers(shared, function, items, max_workers=None):
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker,
+                             initargs=(shared['manifest'],)) as pool:
+        return list(pool.map(function, items))
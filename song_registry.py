@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+# Separator between the normalized title and artist of a registry key
+KEY_SEPARATOR = '\x1f'
+
+
+# Normalize song titles or artists for matching: accents, case, punctuation and whitespace
+def normalize_names(values):
+    text = pd.Series(values, dtype=object).fillna('').astype(str)
+    text = text.str.normalize('NFKD').str.replace('[\u0300-\u036f]', '', regex=True)  # Strip accents
+    text = text.str.casefold().str.replace('&', ' and ', regex=False)
+    text = text.str.replace(r'[^\w\s]', '', regex=True)  # Drop punctuation
+    text = text.str.replace(r'\s+', ' ', regex=True).str.strip()
+    return text.to_numpy()
+
+
+# Build the song registry from every table holding song/artist columns
+def build_song_registry(tables):
+    frames = [df[['song', 'artist']] for df in tables.values()]
+    pairs = pd.concat(frames, ignore_index=True)
+
+    # Only the distinct raw spellings need normalizing. Titles and artists are factorized on their own and
+    # combined as integer codes, much cheaper than hashing (title, artist) tuples of a MultiIndex.
+    song_codes, song_values = pd.factorize(pairs['song'], use_na_sentinel=False)
+    artist_codes, artist_values = pd.factorize(pairs['artist'], use_na_sentinel=False)
+    raw_codes, pair_codes = pd.factorize(song_codes.astype(np.int64) * len(artist_values) + artist_codes)
+    raw_pairs = pd.DataFrame({
+        'song': np.asarray(song_values, dtype=object)[pair_codes // len(artist_values)],
+        'artist': np.asarray(artist_values, dtype=object)[pair_codes % len(artist_values)],
+    })
+    titles = normalize_names(raw_pairs['song'])
+    artists = normalize_names(raw_pairs['artist'])
+    keys = pd.Series(titles, dtype=object) + KEY_SEPARATOR + pd.Series(artists, dtype=object)
+    raw_to_id, registry_keys = pd.factorize(keys)
+    raw_to_id = raw_to_id.astype(np.int32)
+
+    # The first spelling seen (tabdb comes first) is the canonical name of each song
+    first = np.unique(raw_to_id, return_index=True)[1]
+    registry = {
+        'keys': np.asarray(registry_keys, dtype=object),
+        'songs': raw_pairs['song'].to_numpy()[first],
+        'artists': raw_pairs['artist'].to_numpy()[first],
+        'conflicts': find_conflicts(raw_pairs, raw_to_id, titles, artists, first),
+        'song_ids': {},
+    }
+
+    # Hand every table its own int32 song_id column
+    bounds = np.cumsum([0] + [len(df) for df in frames])
+    for (name, _), start, end in zip(tables.items(), bounds[:-1], bounds[1:]):
+        registry['song_ids'][name] = raw_to_id[raw_codes[start:end]]
+    return registry
+
+
+# Report spellings merged into one song and titles shared by different artists
+def find_conflicts(raw_pairs, raw_to_id, titles, artists, first):
+    report = raw_pairs.assign(song_id=raw_to_id, title_key=titles, artist_key=artists)
+    canonical = report.iloc[first].set_index('song_id')
+
+    variants = report.drop(index=first)
+    variants = variants.assign(
+        canonical_song=canonical['song'].reindex(variants['song_id']).to_numpy(),
+        canonical_artist=canonical['artist'].reindex(variants['song_id']).to_numpy(),
+        conflict='spelling variant',
+    )
+
+    # Same normalized title under several artists is worth a look (typo in the artist or a cover)
+    songs = report.iloc[first]
+    shared = songs[songs.duplicated('title_key', keep=False)]
+    shared_first = shared.drop_duplicates('title_key').set_index('title_key')
+    shared = shared[shared.duplicated('title_key', keep='first')]
+    shared = shared.assign(
+        canonical_song=shared_first['song'].reindex(shared['title_key']).to_numpy(),
+        canonical_artist=shared_first['artist'].reindex(shared['title_key']).to_numpy(),
+        conflict='same title, different artist',
+    )
+
+    columns = ['song_id', 'song', 'artist', 'canonical_song', 'canonical_artist', 'conflict']
+    return pd.concat([variants[columns], shared[columns]], ignore_index=True)
+
+
+# song_id of a title and artist matched like the tables are (accents, case, punctuation), -1 when unknown
+def song_id_of(registry, song, artist):
+    key = normalize_names([song])[0] + KEY_SEPARATOR + normalize_names([artist])[0]
+    matches = np.flatnonzero(registry['keys'] == key)
+    return int(matches[0]) if len(matches) else -1
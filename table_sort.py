@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+
+# Start a sort cache for one result set; ranks and permutations are filled lazily
+def new_sort_cache(frame):
+    return {'frame': frame, 'ranks': {}, 'permutations': {}}
+
+
+# Dense ascending rank of every value of a column, missing values rank last (-1)
+def column_ranks(cache, column):
+    if column not in cache['ranks']:
+        values = cache['frame'][column]
+        try:
+            codes, _ = pd.factorize(values, sort=True)
+        except TypeError:
+            # Mixed or unorderable values (e.g. lists) are compared by their text
+            codes, _ = pd.factorize(values.astype(str).where(values.notna()), sort=True)
+        cache['ranks'][column] = codes
+    return cache['ranks'][column]
+
+
+# Stable ascending permutation for several sort keys, the first key being the primary one
+def ascending_permutation(cache, keys):
+    keys = tuple(keys)
+    if keys not in cache['permutations']:
+        ranks = []
+        for key in keys:
+            codes = column_ranks(cache, key)
+            ranks.append(np.where(codes < 0, len(codes), codes))  # Past every rank, also for no rows
+        # np.lexsort sorts by the last key first and is stable
+        permutation = np.lexsort(ranks[::-1]) if ranks else np.arange(len(cache['frame']))
+        missing = int((column_ranks(cache, keys[0]) < 0).sum()) if keys else 0
+        cache['permutations'][keys] = (permutation, missing)
+    return cache['permutations'][keys]
+
+
+# Row positions in sorted order; descending reverses the cached ascending permutation
+def sort_permutation(cache, keys, ascending=True):
+    permutation, missing = ascending_permutation(cache, keys)
+    if ascending:
+        return permutation
+    # Keep rows without a primary value at the end, like DataFrame.sort_values
+    present = len(permutation) - missing
+    return np.concatenate([permutation[:present][::-1], permutation[present:]])
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# The application modules live at the repository root
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+# Data files shipped with the repository
+FILE_PATHS = {
+    'tabdb': os.path.join(REPO_DIR, 'tabdb.csv'),
+    'playdb': os.path.join(REPO_DIR, 'songs_play.csv'),
+    'requestdb': os.path.join(REPO_DIR, 'requestdb.csv'),
+}
+
+
+@pytest.fixture(scope='session')
+def dataset():
+    from ingest import REQUIRED_TABDB_COLUMNS, load_dataset
+    return load_dataset(FILE_PATHS, REQUIRED_TABDB_COLUMNS)
@@ -0,0 +1,79 @@
+import importlib.util
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from export import export_result, iter_play_history_chunks, iter_result_chunks
+
+
+# Rows with a play first, then rows without, so chunks differ in missing values
+def mixed_rows(dataset):
+    playdb_rows = dataset['join_index']['playdb_rows']
+    return np.r_[np.flatnonzero(playdb_rows >= 0), np.flatnonzero(playdb_rows < 0)]
+
+
+def chunk_dtypes(chunks):
+    return {tuple(chunk.dtypes.astype(str)) for chunk in chunks}
+
+
+def test_rows_that_all_have_a_play(dataset, tmp_path):
+    played = np.flatnonzero(dataset['join_index']['playdb_rows'] >= 0)
+    assert export_result(dataset, played, str(tmp_path / 'played.csv')) == len(played)
+
+
+def test_chunks_keep_one_dtype_per_column(dataset):
+    rows = mixed_rows(dataset)
+    assert len(chunk_dtypes(iter_result_chunks(dataset, rows, chunk_size=10))) == 1
+    assert len(chunk_dtypes(iter_play_history_chunks(dataset, rows, chunk_size=10))) == 1
+
+
+def test_csv_and_jsonl_round_trip(dataset, tmp_path):
+    rows = mixed_rows(dataset)
+    export_result(dataset, rows, str(tmp_path / 'result.csv'), chunk_size=10)
+    export_result(dataset, rows, str(tmp_path / 'result.jsonl'), chunk_size=10)
+    csv = pd.read_csv(tmp_path / 'result.csv')
+    with open(tmp_path / 'result.jsonl', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert len(csv) == len(records) == len(rows)
+    assert csv['order_of_song_played'].dtype == float
+
+
+def test_parquet_chunks_share_the_schema(dataset, tmp_path):
+    pytest.importorskip('pyarrow')
+    rows = mixed_rows(dataset)
+    path = str(tmp_path / 'result.parquet')
+    export_result(dataset, rows, path, chunk_size=10)
+    result = pd.read_parquet(path)
+    assert len(result) == len(rows)
+    assert result['order_of_song_played'].dtype == float
+    assert result['order_of_song_played'].notna().any() and result['order_of_song_played'].isna().any()
+
+    history_path = str(tmp_path / 'history.parquet')
+    written = export_result(dataset, rows, history_path, chunk_size=10, play_history=True)
+    assert len(pd.read_parquet(history_path)) == written
+
+
+@pytest.mark.parametrize('play_history', [False, True])
+def test_empty_exports_keep_their_columns(dataset, tmp_path, play_history):
+    all_rows = np.arange(len(dataset['tabdb']))
+    if play_history:
+        # Songs that were never played have no play history
+        played = np.isin(dataset['tabdb']['song_id'], dataset['playdb']['song_id'])
+        rows = np.flatnonzero(~played)
+        assert len(rows)
+        full = next(iter_play_history_chunks(dataset, all_rows))
+    else:
+        rows = np.array([], dtype=np.int64)
+        full = next(iter_result_chunks(dataset, all_rows))
+    columns = [col for col in full.columns if col != 'song_id']
+
+    assert export_result(dataset, rows, str(tmp_path / 'empty.csv'), play_history=play_history) == 0
+    assert pd.read_csv(tmp_path / 'empty.csv').columns.tolist() == columns
+    assert export_result(dataset, rows, str(tmp_path / 'empty.jsonl'), play_history=play_history) == 0
+    assert (tmp_path / 'empty.jsonl').read_text() == ''
+    if importlib.util.find_spec('pyarrow'):
+        export_result(dataset, rows, str(tmp_path / 'empty.parquet'), play_history=play_history)
+        empty = pd.read_parquet(tmp_path / 'empty.parquet')
+        assert empty.empty and empty.columns.tolist() == columns
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ingest
+from ingest import read_playdb, read_requestdb, read_tabdb, REQUIRED_TABDB_COLUMNS
+from validation import build_report
+
+TABDB_HEADER = ','.join(REQUIRED_TABDB_COLUMNS)
+
+
+def write(path, lines):
+    path.write_text('\r\n'.join(lines) + '\r\n', encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture(params=['pyarrow', 'c'])
+def engine(request, monkeypatch):
+    if request.param == 'pyarrow':
+        pytest.importorskip('pyarrow')
+    monkeypatch.setattr(ingest, 'csv_engine', lambda: request.param)
+    return request.param
+
+
+def test_clean_files_are_typed_by_the_reader(tmp_path, engine):
+    tabdb = read_tabdb(write(tmp_path / 'tabdb.csv', [
+        TABDB_HEADER,
+        'Song A,Artist A,1976,Group,male,00:03:46,english,Bastien,new,20241015,2.217,',
+        'Song B,Artist B,,Solo,female,00:02:10,french,Bastien,new,20241022,,',
+    ]), REQUIRED_TABDB_COLUMNS)
+    assert tabdb['duration'].tolist() == [226.0, 130.0]
+    assert tabdb['date'].tolist() == [pd.Timestamp('2024-10-15'), pd.Timestamp('2024-10-22')]
+    assert pd.api.types.is_numeric_dtype(tabdb['year']) and pd.api.types.is_numeric_dtype(tabdb['difficulty'])
+
+    playdb = read_playdb(write(tmp_path / 'playdb.csv', [
+        'song,artist,20241022,20241015',
+        'Song A,Artist A,2,1',
+        'Song B,Artist B,1,',
+    ]))
+    assert playdb['play_order'].dtype == np.float64
+    assert list(zip(playdb['song'], playdb['date'].dt.day, playdb['order_of_song_played'])) == [
+        ('Song A', 15, 1), ('Song B', 22, 1), ('Song A', 22, 2)]
+
+
+def test_unparseable_cells_are_reported(tmp_path, engine):
+    issues = []
+    tabdb = read_tabdb(write(tmp_path / 'tabdb.csv', [
+        TABDB_HEADER,
+        'Song A,Artist A,1976,Group,male,3 minutes,english,Bastien,new,20241015,hard,',
+        'Song B,Artist B,1980,Solo,female,00:02:10,french,Bastien,new,not a date,1.5,',
+    ]), REQUIRED_TABDB_COLUMNS, issues)
+    read_playdb(write(tmp_path / 'playdb.csv', [
+        'song,artist,20241022,20241015',
+        'Song A,Artist A,x,1',
+        'Song B,Artist B,1, ',
+    ]), issues)
+    read_requestdb(write(tmp_path / 'requestdb.csv', [
+        'song,artist,20241022',
+        'Song A,Artist A,G',
+        'Song B,Artist B,Z',
+    ]), issues)
+
+    assert tabdb['difficulty'].tolist()[1] == 1.5 and np.isnan(tabdb['difficulty'].tolist()[0])
+    report = build_report(issues)
+    found = set(zip(report['file'], report['line'], report['column'], report['issue'], report['value'].astype(str)))
+    assert found == {
+        ('tabdb.csv', 2, 'duration', 'unparseable duration', '3 minutes'),
+        ('tabdb.csv', 2, 'difficulty', 'unparseable difficulty', 'hard'),
+        ('tabdb.csv', 3, 'date', 'unparseable date', 'not a date'),
+        ('playdb.csv', 2, '20241022', 'unparseable play order', 'x'),
+        ('requestdb.csv', 3, '20241022', 'unknown request code', 'Z'),
+    }
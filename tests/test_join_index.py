@@ -0,0 +1,31 @@
+import numpy as np
+
+from join_index import gather
+from query import enrich_rows, filter_dataset
+
+
+def test_gather_all_found_and_none_found():
+    values = np.array([3, 1, 2], dtype=np.int64)
+    assert gather(values, np.array([2, 0])).tolist() == [2.0, 3.0]
+    assert gather(values, np.array([], dtype=np.int64)).dtype == float
+    assert np.isnan(gather(values, np.array([-1, 1]))[0])
+
+
+def test_empty_filter_result(dataset):
+    full = filter_dataset(dataset, {})
+    empty = filter_dataset(dataset, {'year_range': (3000, 3001)})
+    assert empty.empty
+    assert empty.dtypes.to_dict() == full.dtypes.to_dict()
+
+
+def test_rows_that_all_have_a_play(dataset):
+    played = np.flatnonzero(dataset['join_index']['playdb_rows'] >= 0)
+    enriched = enrich_rows(dataset, played)
+    assert len(enriched) == len(played)
+    assert enriched['order_of_song_played'].notna().all()
+    assert enriched.dtypes.to_dict() == filter_dataset(dataset, {}).dtypes.to_dict()
+
+
+def test_single_language_filter(dataset):
+    german = filter_dataset(dataset, {'languages': ['german']})
+    assert (german['language'] == 'german').all()
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+import pytest
+
+import server
+
+
+# Serve the shipped dataset on an ephemeral localhost port from a background event loop
+@pytest.fixture(scope='module')
+def base_url(dataset):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    http_server, state = asyncio.run_coroutine_threadsafe(
+        server.start_server(dataset, host='127.0.0.1', port=0, chart_processes=2), loop).result()
+    host, port = http_server.sockets[0].getsockname()[:2]
+    yield f'http://{host}:{port}'
+
+    async def stop():
+        http_server.close()
+        await http_server.wait_closed()
+    asyncio.run_coroutine_threadsafe(stop(), loop).result()
+    server.close_server_state(state)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def get(base_url, path):
+    try:
+        with urlopen(base_url + path, timeout=60) as response:
+            return response.status, response.headers['Content-Type'], response.read()
+    except HTTPError as e:
+        return e.code, e.headers['Content-Type'], e.read()
+
+
+def test_health_and_unknown_path(base_url):
+    assert get(base_url, '/health')[0] == 200
+    assert get(base_url, '/nowhere')[0] == 404
+
+
+def test_filter_pages_and_sorts(base_url, dataset):
+    status, content_type, body = get(base_url, '/filter?languages=english&sort=year&order=desc&limit=5')
+    assert status == 200 and content_type == 'application/json'
+    page = json.loads(body)
+    english = (dataset['tabdb']['language'] == 'english').sum()
+    assert page['total'] == english and len(page['rows']) == min(5, english)
+    years = [row['year'] for row in page['rows']]
+    assert years == sorted(years, reverse=True)
+
+
+@pytest.mark.parametrize('query', [
+    'year_range=abc',
+    'difficulty_range=1',
+    'date_range=2024-01-01,not-a-date',
+    'limit=ten',
+    'sort=no_such_column',
+])
+def test_malformed_parameters_are_bad_requests(base_url, query):
+    status, _, body = get(base_url, '/filter?' + query)
+    assert status == 400
+    assert 'error' in json.loads(body)
+
+
+def test_failures_while_filtering_are_server_errors(base_url, monkeypatch):
+    def broken_filter(dataset, criteria):
+        raise ValueError("broken join index")
+    monkeypatch.setattr(server, 'filter_dataset', broken_filter)
+    status, _, body = get(base_url, '/filter?tabbers=nobody-in-particular')
+    assert status == 500
+    assert 'broken join index' in json.loads(body)['error']
+
+
+def test_charts_render_in_processes_like_in_process(base_url, dataset):
+    for plot in ('language', 'sessions'):
+        status, content_type, body = get(base_url, f'/chart.png?plot={plot}&languages=english')
+        assert status == 200 and content_type == 'image/png'
+        params = {'plot': [plot], 'languages': ['english']}
+        assert body == server.handle_chart(server.handler_state(dataset), params)[2]
+    assert get(base_url, '/chart.png?plot=nonsense')[0] == 400
+
+
+def test_empty_result_sorts_to_an_empty_page(base_url):
+    status, _, body = get(base_url, '/filter?difficulty_range=1,1.0&sort=artist,year&order=desc')
+    assert status == 200
+    assert json.loads(body) == {'total': 0, 'offset': 0, 'rows': []}
+
+
+def test_session_chart_of_songs_never_played(base_url):
+    status, content_type, body = get(base_url, '/chart.png?plot=rotation&languages=spanish')
+    assert status == 200 and content_type == 'image/png'
+    assert body.startswith(b'\x89PNG')
+
+
+def test_concurrent_sorts_share_one_result(base_url, dataset):
+    paths = [f'/filter?sources=new&sort={keys}&order={order}'
+             for keys in ('artist,year', 'year,song', 'difficulty', 'song') for order in ('asc', 'desc')]
+    # Distinct limits (all past the result size) so no request is answered from the response cache
+    requests = [f'{path}&limit={1000 + copy}' for copy in range(8) for path in paths]
+    with ThreadPoolExecutor(16) as pool:
+        responses = list(pool.map(lambda path: get(base_url, path), requests))
+    assert all(status == 200 for status, _, _ in responses)
+    for i, path in enumerate(paths):
+        bodies = {body for _, _, body in responses[i::len(paths)]}
+        assert len(bodies) == 1, path
+
+
+def test_what_follows_a_song(base_url, dataset):
+    song, artist = dataset['playdb'][['song', 'artist']].iloc[0]
+    status, _, body = get(base_url, '/stats?' + urlencode({'kind': 'follows', 'song': song.upper(), 'artist': artist}))
+    assert status == 200
+    stats = json.loads(body)
+    assert stats['position']['plays'] >= 1
+    assert all(row['transitions'] >= 1 for row in stats['follows'])
+    assert get(base_url, '/stats?kind=follows&song=No+such+song&artist=Nobody')[0] == 400
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from setlist import difficulty_targets, generate_setlist, mix_bounds
+
+
+# 120 songs over three languages and two genders, durations of 2 to 5 minutes and difficulties of 1 to 4
+@pytest.fixture
+def catalogue():
+    rng = np.random.default_rng(7)
+    n = 120
+    tabdb = pd.DataFrame({
+        'song_id': np.arange(n),
+        'song': [f"Song {i}" for i in range(n)],
+        'artist': [f"Artist {i % 17}" for i in range(n)],
+        'difficulty': rng.uniform(1, 4, n).round(2),
+        'duration': rng.uniform(120, 300, n).round(),
+        'language': np.array(['english', 'french', 'irish'])[np.arange(n) % 3],
+        'gender': np.array(['male', 'female'])[np.arange(n) % 2],
+    })
+    dates = pd.to_datetime(['2024-09-03', '2024-09-10', '2024-09-17'])
+    playdb = pd.DataFrame({'song_id': np.arange(0, 60, 2), 'date': np.resize(dates, 30)})
+    requestdb = pd.DataFrame({'song_id': np.arange(1, 60, 3), 'date': np.resize(dates, 20)})
+    return tabdb, playdb, requestdb
+
+
+def test_difficulty_targets_follow_the_curve():
+    assert difficulty_targets((2.0, 3.0, 2.0), 5).tolist() == [2.0, 2.5, 3.0, 2.5, 2.0]
+    assert difficulty_targets((1.5,), 3).tolist() == [1.5, 1.5, 1.5]
+
+
+def test_setlist_respects_duration_and_difficulty_targets(catalogue):
+    (_, best), *_ = generate_setlist(*catalogue, n_songs=12, target_duration=12 * 210)
+    assert best['position'].tolist() == list(range(1, 13))
+    assert best['song'].is_unique
+    assert abs(best['duration'].sum() - 12 * 210) <= 60
+    assert np.allclose(best['target_difficulty'], difficulty_targets((2.0, 3.0, 2.0), 12).round(2))
+    assert (best['difficulty'] - best['target_difficulty']).abs().mean() < 0.5
+
+
+def test_setlist_respects_mix_bounds(catalogue):
+    setlists = generate_setlist(*catalogue, n_songs=10, target_duration=10 * 210,
+                                language_mix={'french': (0.4, 0.6), 'irish': (0.0, 0.1)},
+                                gender_mix={'female': (0.7, 1.0)})
+    for _, setlist in setlists:
+        languages = setlist['language'].value_counts()
+        assert 4 <= languages.get('french', 0) <= 6
+        assert languages.get('irish', 0) <= 1
+        assert (setlist['gender'] == 'female').sum() >= 7
+
+
+def test_alternatives_are_distinct_and_ranked(catalogue):
+    setlists = generate_setlist(*catalogue, n_songs=8, target_duration=8 * 210, n_alternatives=4)
+    assert len(setlists) > 1
+    objectives = [objective for objective, _ in setlists]
+    assert objectives == sorted(objectives, reverse=True)
+    assert len({tuple(setlist['song']) for _, setlist in setlists}) == len(setlists)
+
+
+def test_mix_bounds_that_cross_are_rejected_clearly():
+    values = np.array(['french'] * 100 + ['english'] * 100)
+    with pytest.raises(ValueError, match="no whole number of songs"):
+        mix_bounds(values, {'french': (0.5, 0.5)}, 5)
+    _, lower, upper = mix_bounds(values, {'french': (0.3, 0.3)}, 10)
+    assert (lower[0], upper[0]) == (3, 3)
+    with pytest.raises(ValueError, match="allow fewer songs"):
+        mix_bounds(values, {'french': (0.0, 0.2), 'english': (0.0, 0.2)}, 10)
@@ -0,0 +1,63 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared_data
+from server import close_server_state, create_server_state
+from shared_data import SHARED_TABLES, attach_dataset, publish_dataset, release_segments, run_in_workers
+
+
+def segment_names(shared):
+    return [spec['array']['name'] for columns in shared['manifest']['tables'].values() for spec in columns.values()]
+
+
+def assert_unlinked(names):
+    assert names
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+# Runs in a pool worker: summary of one table of the dataset it attached
+def table_summary(name):
+    df = shared_data.worker_data[name]
+    return len(df), df['song_id'].astype(np.int64).sum(), list(df.columns), 'join_index' in shared_data.worker_data
+
+
+def test_attach_gives_back_the_published_tables(dataset):
+    shared = publish_dataset(dataset)
+    try:
+        attached, segments = attach_dataset(shared['manifest'], decode_text=True)
+        for name in SHARED_TABLES:
+            pd.testing.assert_frame_equal(attached[name], dataset[name].reset_index(drop=True))
+        assert not attached['playdb']['song_id'].to_numpy().flags.writeable
+        categorical, categorical_segments = attach_dataset(shared['manifest'], build_indexes=False)
+        assert isinstance(categorical['tabdb']['language'].dtype, pd.CategoricalDtype)
+        assert categorical['tabdb']['language'].astype(object).equals(dataset['tabdb']['language'].astype(object))
+        del attached, categorical
+        release_segments(segments)
+        release_segments(categorical_segments)
+    finally:
+        release_segments(shared['segments'], unlink=True)
+    assert_unlinked(segment_names(shared))
+
+
+def test_workers_share_the_dataset_and_segments_are_unlinked(dataset):
+    with shared_data.shared_dataset(dataset) as shared:
+        summaries = run_in_workers(shared, table_summary, SHARED_TABLES, max_workers=2)
+        names = segment_names(shared)
+    for name, (rows, song_id_sum, columns, indexed) in zip(SHARED_TABLES, summaries):
+        assert rows == len(dataset[name])
+        assert song_id_sum == dataset[name]['song_id'].astype(np.int64).sum()
+        assert columns == list(dataset[name].columns)
+        assert indexed
+    assert_unlinked(names)
+
+
+def test_closing_the_server_state_unlinks_its_segments(dataset):
+    state = create_server_state(dataset, chart_processes=1)
+    names = segment_names(state['shared'])
+    close_server_state(state)
+    assert_unlinked(names)
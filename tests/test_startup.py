@@ -0,0 +1,76 @@
+import ast
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import REPO_DIR
+
+APP_PATH = os.path.join(REPO_DIR, 'ukulelecode.py')
+
+# Runs ukulelecode.py up to its main loop in a fresh interpreter, with stand-in tkinter and ttkbootstrap
+# modules so no display is needed, then reports the modules it imported on the way
+STARTUP_SCRIPT = """
+import json, runpy, sys
+from unittest import mock
+
+for name in ('tkinter', 'tkinter.filedialog', 'tkinter.messagebox', 'tkinter.ttk', 'ttkbootstrap'):
+    sys.modules[name] = mock.MagicMock(name=name)
+
+app_globals = runpy.run_path(sys.argv[1], run_name='__main__')
+print(json.dumps({
+    'deferred': app_globals['DEFERRED_MODULES'],
+    'imported': sorted(name for name in app_globals['DEFERRED_MODULES'] if name in sys.modules),
+    'mainloop_started': app_globals['app'].mainloop.called,
+}))
+"""
+
+
+# Module-level constant of ukulelecode.py, read without running it
+def app_constant(name):
+    with open(APP_PATH, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(target, 'id', None) == name for target in node.targets):
+            return ast.literal_eval(node.value)
+    raise KeyError(name)
+
+
+# The import statements at the top level of ukulelecode.py, as source lines
+def app_imports():
+    with open(APP_PATH, encoding='utf-8') as f:
+        source = f.read()
+    return [ast.get_source_segment(source, node) for node in ast.parse(source).body
+            if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def test_welcome_window_skips_deferred_modules():
+    result = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, APP_PATH],
+                            cwd=REPO_DIR, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    startup = json.loads(result.stdout.strip().splitlines()[-1])
+    assert startup['mainloop_started']
+    assert startup['deferred']
+    assert startup['imported'] == []
+
+
+def test_startup_imports_fit_the_budget():
+    pytest.importorskip('tkinter')
+    pytest.importorskip('ttkbootstrap')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', '\n'.join(app_imports())],
+                            cwd=REPO_DIR, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+    # Lines read "import time: self [us] | cumulative [us] | name"; nested imports have an indented name
+    cumulative_us, imported = 0, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or line.endswith('| imported package'):
+            continue
+        _, cumulative, name = line.split('|')
+        imported.add(name.strip())
+        if not name[1:].startswith(' '):
+            cumulative_us += int(cumulative)
+    assert not imported & set(app_constant('DEFERRED_MODULES'))
+    assert cumulative_us / 1e6 < app_constant('STARTUP_BUDGET_SECONDS')
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from table_sort import ascending_permutation, new_sort_cache, sort_permutation
+
+
+def small_frame():
+    return pd.DataFrame({
+        'artist': ['B', 'A', 'B', None, 'A', 'C'],
+        'year': [1990, 2001, 1985, 1970, 2001, np.nan],
+        'tags': [['x'], ['y'], ['x'], [], ['z'], ['y']],
+    })
+
+
+def test_empty_frame_sorts_to_no_rows():
+    cache = new_sort_cache(small_frame().iloc[:0])
+    for ascending in (True, False):
+        assert sort_permutation(cache, ['artist', 'year'], ascending=ascending).tolist() == []
+    assert sort_permutation(cache, []).tolist() == []
+
+
+def test_multi_key_ties_are_broken_by_the_next_key():
+    cache = new_sort_cache(small_frame())
+    # artist ties (A, A and B, B) ordered by year; the missing artist comes last
+    assert sort_permutation(cache, ['artist', 'year']).tolist() == [1, 4, 2, 0, 5, 3]
+    # Both A rows tie on artist and year, so they keep their frame order
+    assert sort_permutation(cache, ['year', 'artist']).tolist() == [3, 2, 0, 1, 4, 5]
+
+
+def test_missing_values_stay_last_when_descending():
+    cache = new_sort_cache(small_frame())
+    assert sort_permutation(cache, ['artist'], ascending=False).tolist()[-1] == 3
+    assert sort_permutation(cache, ['year'], ascending=False).tolist() == [4, 1, 0, 2, 3, 5]
+    frame = small_frame()
+    expected = frame['year'].sort_values(ascending=False, na_position='last').to_numpy()
+    assert np.array_equal(frame['year'].to_numpy()[sort_permutation(cache, ['year'], ascending=False)], expected,
+                          equal_nan=True)
+
+
+def test_permutations_are_cached_and_unorderable_values_sort_as_text():
+    cache = new_sort_cache(small_frame())
+    first = ascending_permutation(cache, ['tags'])
+    assert ascending_permutation(cache, ['tags']) is first
+    # As text, "[]" sorts after "['z']"
+    assert sort_permutation(cache, ['tags']).tolist() == [0, 2, 1, 5, 4, 3]
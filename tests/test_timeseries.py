@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib.figure import Figure
+
+from plots import TIMESERIES_PLOT_TITLES, draw_plot
+from query import filter_dataset
+from timeseries import (restrict_layout, rolling_category_counts, rolling_sum, rotation_rates, session_counts,
+                        session_layout, song_categories)
+
+
+# Three sessions over three songs: song 0 in sessions 0 and 1, song 1 in sessions 0 and 2, song 2 in session 2
+def small_layout():
+    return {
+        'sessions': pd.DatetimeIndex(['2024-01-02', '2024-01-09', '2024-01-16']),
+        'n_songs': 3,
+        'play_session': np.array([0, 0, 1, 2, 2]),
+        'play_song': np.array([0, 1, 0, 2, 1]),
+        'request_session': np.array([0, 2]),
+        'request_song': np.array([1, 0]),
+    }
+
+
+@pytest.fixture
+def unplayed_layout(dataset):
+    layout = session_layout(dataset)
+    unplayed = np.setdiff1d(np.arange(layout['n_songs']), layout['play_song'])
+    return restrict_layout(layout, unplayed)
+
+
+def test_rolling_sum_covers_the_last_window():
+    assert rolling_sum(np.array([1, 2, 3, 4]), 2).tolist() == [1, 3, 5, 7]
+
+
+def test_rotation_rates_of_hand_built_sessions():
+    rates = rotation_rates(small_layout(), window=1)
+    assert rates['novelty_rate'].tolist() == [1.0, 0.0, 0.5]
+    assert rates['rotation_rate'].tolist() == [1.0, 0.0, 1.0]
+    assert rates['repeat_rate'].tolist() == [0.0, 1.0, 0.0]
+
+
+def test_session_counts_of_hand_built_sessions():
+    counts = session_counts(small_layout())
+    assert counts['plays'].tolist() == [2, 1, 2]
+    assert counts['requests'].tolist() == [1, 0, 1]
+    assert counts['requests_played'].tolist() == [1, 0, 0]
+
+
+def test_unplayed_songs_give_undefined_rates_and_no_categories(dataset, unplayed_layout):
+    assert len(unplayed_layout['play_session']) == 0
+    rates = rotation_rates(unplayed_layout)
+    assert len(rates) == len(unplayed_layout['sessions'])
+    assert rates.isna().all().all()
+    counts = rolling_category_counts(unplayed_layout, *song_categories(dataset, 'language'))
+    assert counts.columns.empty and len(counts) == len(unplayed_layout['sessions'])
+
+
+@pytest.mark.parametrize('plot_type', list(TIMESERIES_PLOT_TITLES))
+def test_session_plots_draw_for_unplayed_songs(dataset, unplayed_layout, plot_type):
+    ax = Figure().subplots()
+    draw_plot(ax, None, plot_type, layout=unplayed_layout, categories=song_categories(dataset, 'language'))
+    assert ax.get_title() == TIMESERIES_PLOT_TITLES[plot_type]
+
+
+@pytest.mark.parametrize('plot_type', list(TIMESERIES_PLOT_TITLES))
+def test_session_plots_draw_for_a_filter_without_plays(dataset, plot_type):
+    filtered = filter_dataset(dataset, {'languages': ['spanish']})
+    layout = restrict_layout(session_layout(dataset), filtered['song_id'].to_numpy())
+    ax = Figure().subplots()
+    draw_plot(ax, filtered, plot_type, layout=layout, categories=song_categories(dataset, 'language'))
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from transition_graph import (add_session, add_sequences, build_transition_graph, difficulty_deltas,
+                              new_transition_graph, opener_closer_frequencies, typical_position, what_follows)
+
+# Three sessions over four songs; song 3 has no known difficulty
+SESSIONS = [[0, 1, 2], [0, 1, 3], [2, 0, 1]]
+DIFFICULTY = [1.0, 2.0, 3.0, np.nan]
+
+
+@pytest.fixture
+def small_graph():
+    graph = new_transition_graph(4, DIFFICULTY)
+    for session in SESSIONS:
+        add_session(graph, session)
+    return graph
+
+
+def assert_same_graph(graph, expected):
+    assert graph.keys() == expected.keys()
+    for name, value in expected.items():
+        if isinstance(value, np.ndarray) and value.dtype.kind == 'f':
+            assert np.allclose(graph[name], value, equal_nan=True), name
+        else:
+            assert np.array_equal(graph[name], value), name
+
+
+def test_adding_sessions_matches_a_full_rebuild(dataset):
+    expected = build_transition_graph(dataset)
+
+    # Same ordering as the full build, then every session after the first half added one at a time
+    playdb = dataset['playdb'].dropna(subset=['date'])
+    dates = playdb['date'].to_numpy()
+    order = np.lexsort((playdb['order_of_song_played'].to_numpy(), dates))
+    songs, dates = playdb['song_id'].to_numpy()[order], dates[order]
+    starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+    split = starts[len(starts) // 2]
+
+    graph = new_transition_graph(len(expected['plays']), expected['difficulty'])
+    add_sequences(graph, songs[:split], dates[:split])
+    for start, end in zip(starts[len(starts) // 2:], np.r_[starts[len(starts) // 2 + 1:], len(songs)]):
+        add_session(graph, songs[start:end])
+    assert_same_graph(graph, expected)
+
+
+def test_what_follows_hand_built_sessions(small_graph):
+    follows = what_follows(small_graph, 0)
+    assert follows['song_id'].tolist() == [1]
+    assert follows['transitions'].tolist() == [3]
+    assert follows['share'].tolist() == [1.0]
+
+    # Ties are broken by song_id
+    follows = what_follows(small_graph, 1)
+    assert follows['song_id'].tolist() == [2, 3]
+    assert follows['share'].tolist() == [0.5, 0.5]
+
+    assert what_follows(small_graph, 3).empty
+    assert what_follows(small_graph, 99).empty
+
+
+def test_typical_position_hand_built_sessions(small_graph):
+    first = typical_position(small_graph, 0)
+    assert first['plays'] == 3
+    assert first['mean_position'] == pytest.approx(4 / 3)
+    assert first['mean_relative_position'] == pytest.approx(4 / 9)
+    assert first['opener_rate'] == pytest.approx(2 / 3)
+    assert first['closer_rate'] == 0
+    assert first['mean_next_difficulty_delta'] == pytest.approx(1.0)
+
+    # Song 3 is only played last and has no known difficulty
+    last = typical_position(small_graph, 3)
+    assert (last['plays'], last['mean_position'], last['closer_rate']) == (1, 3, 1)
+    assert np.isnan(last['mean_next_difficulty_delta'])
+
+    # The 1 -> 3 transition has no difficulty change, so only 1 -> 2 counts
+    assert typical_position(small_graph, 1)['mean_next_difficulty_delta'] == pytest.approx(1.0)
+    assert typical_position(small_graph, 99)['plays'] == 0
+
+
+def test_openers_closers_and_difficulty_deltas(small_graph):
+    frequencies = opener_closer_frequencies(small_graph)
+    assert frequencies['song_id'].tolist() == [0, 2, 1, 3]
+    assert frequencies['openers'].tolist() == [2, 1, 0, 0]
+    deltas = difficulty_deltas(small_graph).set_index(['song_id', 'next_song_id'])
+    assert deltas.loc[(0, 1), 'transitions'] == 3
+    assert deltas.loc[(2, 0), 'difficulty_delta'] == -2.0
+    assert np.isnan(deltas.loc[(1, 3), 'difficulty_delta'])
+
+
+def test_session_of_one_song(small_graph):
+    pair_keys = small_graph['pair_keys'].copy()
+    top_following = small_graph['top_following'].copy()
+    add_session(small_graph, [3])
+    assert small_graph['n_sessions'] == 4
+    assert np.array_equal(small_graph['pair_keys'], pair_keys)
+    assert np.array_equal(small_graph['top_following'], top_following)
+    position = typical_position(small_graph, 3)
+    assert (position['plays'], position['opener_rate'], position['closer_rate']) == (2, 0.5, 1.0)
+
+    # A new song in a one-song session grows the graph
+    graph = new_transition_graph(0)
+    add_session(graph, [5])
+    assert len(graph['plays']) == 6 and graph['openers'][5] == graph['closers'][5] == 1
+    assert what_follows(graph, 5).empty
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+# Sessions covered by the rolling windows unless told otherwise (about two months of Tuesdays)
+DEFAULT_WINDOW = 8
+
+
+# Sparse session x song layout of the plays and requests: one (session, song) pair per event
+def build_session_layout(dataset):
+    playdb = dataset['playdb'].dropna(subset=['date'])
+    requestdb = dataset['requestdb'].dropna(subset=['date'])
+    sessions = pd.DatetimeIndex(np.union1d(playdb['date'].to_numpy(), requestdb['date'].to_numpy()))
+    return {
+        'sessions': sessions,
+        'n_songs': len(dataset['song_registry']['keys']),
+        'play_session': sessions.get_indexer(playdb['date']),
+        'play_song': playdb['song_id'].to_numpy(dtype=np.int64),
+        'request_session': sessions.get_indexer(requestdb['date']),
+        'request_song': requestdb['song_id'].to_numpy(dtype=np.int64),
+    }
+
+
+# Session layout of a dataset, built on first use and kept with the dataset
+def session_layout(dataset):
+    if 'session_layout' not in dataset:
+        dataset['session_layout'] = build_session_layout(dataset)
+    return dataset['session_layout']
+
+
+# Same layout keeping only the events of the given songs
+def restrict_layout(layout, song_ids):
+    keep = np.zeros(layout['n_songs'], dtype=bool)
+    keep[np.asarray(song_ids, dtype=np.int64)] = True
+    plays = keep[layout['play_song']]
+    requests = keep[layout['request_song']]
+    return dict(layout,
+                play_session=layout['play_session'][plays], play_song=layout['play_song'][plays],
+                request_session=layout['request_session'][requests], request_song=layout['request_song'][requests])
+
+
+# Sum over the last `window` sessions along the first axis, using cumulative sums
+def rolling_sum(values, window):
+    totals = np.cumsum(values, axis=0, dtype=float)
+    if window < len(totals):
+        totals[window:] = totals[window:] - totals[:-window].copy()
+    return totals
+
+
+# Mean over the last `window` sessions (fewer at the start of the series)
+def rolling_mean(values, window):
+    sessions = np.minimum(np.arange(1, len(values) + 1), window)
+    return rolling_sum(values, window) / sessions.reshape((-1,) + (1,) * (np.ndim(values) - 1))
+
+
+# Per-session counts of plays, distinct songs, requests and requests that were played
+def session_counts(layout):
+    n_sessions = len(layout['sessions'])
+    play_keys = layout['play_session'] * layout['n_songs'] + layout['play_song']
+    request_keys = np.unique(layout['request_session'] * layout['n_songs'] + layout['request_song'])
+    converted = np.isin(request_keys, play_keys)
+    request_sessions = request_keys // layout['n_songs']
+    return pd.DataFrame({
+        'plays': np.bincount(layout['play_session'], minlength=n_sessions),
+        'songs': np.bincount(np.unique(play_keys) // layout['n_songs'], minlength=n_sessions),
+        'requests': np.bincount(request_sessions, minlength=n_sessions),
+        'requests_played': np.bincount(request_sessions[converted], minlength=n_sessions),
+    }, index=layout['sessions'])
+
+
+# Rolling play counts of the given songs, one column per song
+def rolling_song_counts(layout, song_ids, window=DEFAULT_WINDOW, names=None):
+    song_ids = np.asarray(song_ids, dtype=np.int64)
+    columns = np.full(layout['n_songs'], -1, dtype=np.int64)
+    columns[song_ids] = np.arange(len(song_ids))
+    plays = columns[layout['play_song']]
+    selected = plays >= 0
+    n_sessions = len(layout['sessions'])
+    counts = np.bincount(layout['play_session'][selected] * len(song_ids) + plays[selected],
+                         minlength=n_sessions * len(song_ids)).reshape(n_sessions, len(song_ids))
+    return pd.DataFrame(rolling_sum(counts, window), index=layout['sessions'],
+                        columns=names if names is not None else song_ids)
+
+
+# Category code of every song_id from a tabdb column, songs missing from tabdb are 'Unknown'
+def song_categories(dataset, column):
+    tabdb = dataset['tabdb']
+    codes, labels = pd.factorize(tabdb[column].fillna('Unknown'))
+    categories = np.full(len(dataset['song_registry']['keys']), len(labels), dtype=np.int64)
+    categories[tabdb['song_id'].to_numpy()] = codes
+    return categories, list(labels) + ['Unknown']
+
+
+# Rolling play counts per category, one column per category
+def rolling_category_counts(layout, categories, labels, window=DEFAULT_WINDOW):
+    n_sessions = len(layout['sessions'])
+    counts = np.bincount(layout['play_session'] * len(labels) + categories[layout['play_song']],
+                         minlength=n_sessions * len(labels)).reshape(n_sessions, len(labels))
+    frame = pd.DataFrame(rolling_sum(counts, window), index=layout['sessions'], columns=labels)
+    return frame.loc[:, frame.any()]
+
+
+# Share of plays that are first-ever plays (novelty) and of plays not repeated from the previous window (rotation)
+def rotation_rates(layout, window=DEFAULT_WINDOW):
+    n_sessions = len(layout['sessions'])
+    sessions = layout['play_session']
+    songs = layout['play_song']
+
+    # Previous session each song was played in, from plays ordered by song then session.
+    # The diffs keep one entry per play, also when there are no plays at all.
+    order = np.lexsort((sessions, songs))
+    ordered_sessions = sessions[order]
+    same_song = np.diff(songs[order], prepend=-1) == 0
+    gap = np.where(same_song, np.diff(ordered_sessions, prepend=0), np.iinfo(np.int64).max)
+    first_play = ~same_song
+    fresh = gap > window  # Not played in the previous `window` sessions
+
+    plays = rolling_sum(np.bincount(sessions, minlength=n_sessions), window)
+    new = rolling_sum(np.bincount(ordered_sessions[first_play], minlength=n_sessions), window)
+    rotated = rolling_sum(np.bincount(ordered_sessions[fresh], minlength=n_sessions), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return pd.DataFrame({
+            'novelty_rate': new / plays,
+            'rotation_rate': rotated / plays,
+            'repeat_rate': 1 - rotated / plays,
+        }, index=layout['sessions'])
+
+
+# Share of requested songs that were played in the same session, over a rolling window
+def conversion_rates(layout, window=DEFAULT_WINDOW):
+    counts = session_counts(layout)
+    requests = rolling_sum(counts['requests'].to_numpy(), window)
+    played = rolling_sum(counts['requests_played'].to_numpy(), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rates = played / requests
+    return pd.DataFrame({'requests': requests, 'requests_played': played, 'conversion_rate': rates},
+                        index=layout['sessions'])
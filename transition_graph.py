@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+
+# Following songs kept per song for "what usually follows" lookups
+DEFAULT_TOP_K = 5
+
+# A (song, next song) pair is stored as one int64 key: song_id in the high bits, next song_id in the low bits
+KEY_SHIFT = 32
+KEY_MASK = (1 << KEY_SHIFT) - 1
+
+
+# Empty graph over n_songs songs, with the difficulty of each song (NaN when unknown)
+def new_transition_graph(n_songs, difficulty=None, top_k=DEFAULT_TOP_K):
+    return {
+        'top_k': top_k,
+        'n_sessions': 0,
+        'difficulty': np.full(n_songs, np.nan) if difficulty is None else np.asarray(difficulty, dtype=float),
+        # Sparse song -> next song counts, sorted by key
+        'pair_keys': np.array([], dtype=np.int64),
+        'pair_counts': np.array([], dtype=np.int64),
+        # Per-song totals, indexed by song_id
+        'plays': np.zeros(n_songs, dtype=np.int64),
+        'openers': np.zeros(n_songs, dtype=np.int64),
+        'closers': np.zeros(n_songs, dtype=np.int64),
+        'followed': np.zeros(n_songs, dtype=np.int64),
+        'position_sum': np.zeros(n_songs),
+        'relative_position_sum': np.zeros(n_songs),
+        'delta_sum': np.zeros(n_songs),
+        'delta_count': np.zeros(n_songs, dtype=np.int64),
+        # Most frequent next songs of each song, -1 where there are fewer than top_k
+        'top_following': np.full((n_songs, top_k), -1, dtype=np.int64),
+        'top_counts': np.zeros((n_songs, top_k), dtype=np.int64),
+    }
+
+
+# Make room for song_ids up to n_songs - 1; new songs have no known difficulty
+def grow_graph(graph, n_songs):
+    extra = n_songs - len(graph['plays'])
+    if extra <= 0:
+        return
+    for name in ('plays', 'openers', 'closers', 'followed', 'position_sum', 'relative_position_sum',
+                 'delta_sum', 'delta_count', 'top_counts'):
+        graph[name] = np.concatenate([graph[name], np.zeros((extra,) + graph[name].shape[1:], dtype=graph[name].dtype)])
+    graph['difficulty'] = np.concatenate([graph['difficulty'], np.full(extra, np.nan)])
+    graph['top_following'] = np.concatenate([graph['top_following'], np.full((extra, graph['top_k']), -1, dtype=np.int64)])
+
+
+# Add pair counts, incrementing the known pairs in place and inserting the new ones in key order
+def add_pairs(graph, songs, next_songs):
+    keys, counts = np.unique((songs << KEY_SHIFT) | next_songs, return_counts=True)
+    pair_keys = graph['pair_keys']
+    positions = np.searchsorted(pair_keys, keys)
+    known = np.zeros(len(keys), dtype=bool)
+    if len(pair_keys):
+        known = pair_keys[np.minimum(positions, len(pair_keys) - 1)] == keys
+    graph['pair_counts'][positions[known]] += counts[known]
+    graph['pair_keys'] = np.insert(pair_keys, positions[~known], keys[~known])
+    graph['pair_counts'] = np.insert(graph['pair_counts'], positions[~known], counts[~known])
+
+
+# Recompute the top following songs of the given songs from their pair counts
+def update_top_following(graph, songs):
+    songs = np.unique(np.asarray(songs, dtype=np.int64))
+    if not len(songs):
+        return
+    pair_keys = graph['pair_keys']
+
+    # Pairs of each song are one contiguous range of the sorted keys
+    starts = np.searchsorted(pair_keys, songs << KEY_SHIFT)
+    lengths = np.searchsorted(pair_keys, (songs + 1) << KEY_SHIFT) - starts
+    offsets = np.cumsum(lengths) - lengths
+    pairs = np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+
+    # Most frequent first, ties broken by song_id; rank within each song's range
+    source = pair_keys[pairs] >> KEY_SHIFT
+    following = pair_keys[pairs] & KEY_MASK
+    counts = graph['pair_counts'][pairs]
+    order = np.lexsort((following, -counts, source))
+    source, following, counts = source[order], following[order], counts[order]
+    rank = np.arange(len(source)) - np.repeat(offsets, lengths)
+    kept = rank < graph['top_k']
+
+    graph['top_following'][songs] = -1
+    graph['top_counts'][songs] = 0
+    graph['top_following'][source[kept], rank[kept]] = following[kept]
+    graph['top_counts'][source[kept], rank[kept]] = counts[kept]
+
+
+# Add sessions given as song_ids in play order, with a session label per song (equal labels are contiguous)
+def add_sequences(graph, songs, session_labels):
+    songs = np.asarray(songs, dtype=np.int64)
+    session_labels = np.asarray(session_labels)
+    if not len(songs):
+        return graph
+    grow_graph(graph, int(songs.max()) + 1)
+    n_songs = len(graph['plays'])
+
+    # Session boundaries, position of every play and length of its session
+    same_session = session_labels[1:] == session_labels[:-1]
+    first = np.r_[True, ~same_session]
+    last = np.r_[~same_session, True]
+    starts = np.flatnonzero(first)
+    lengths = np.diff(np.r_[starts, len(songs)])
+    position = np.arange(len(songs)) - np.repeat(starts, lengths) + 1
+
+    graph['n_sessions'] += len(starts)
+    graph['plays'] += np.bincount(songs, minlength=n_songs)
+    graph['openers'] += np.bincount(songs[first], minlength=n_songs)
+    graph['closers'] += np.bincount(songs[last], minlength=n_songs)
+    graph['position_sum'] += np.bincount(songs, weights=position, minlength=n_songs)
+    graph['relative_position_sum'] += np.bincount(songs, weights=position / np.repeat(lengths, lengths),
+                                                  minlength=n_songs)
+
+    # Consecutive songs of the same session, and the change in difficulty between them
+    previous, following = songs[:-1][same_session], songs[1:][same_session]
+    graph['followed'] += np.bincount(previous, minlength=n_songs)
+    delta = graph['difficulty'][following] - graph['difficulty'][previous]
+    known = ~np.isnan(delta)
+    graph['delta_sum'] += np.bincount(previous[known], weights=delta[known], minlength=n_songs)
+    graph['delta_count'] += np.bincount(previous[known], minlength=n_songs)
+
+    add_pairs(graph, previous, following)
+    update_top_following(graph, previous)
+    return graph
+
+
+# Add one session given as song_ids in play order; only the songs it touches are updated
+def add_session(graph, song_ids):
+    song_ids = np.asarray(song_ids, dtype=np.int64)
+    return add_sequences(graph, song_ids, np.zeros(len(song_ids), dtype=np.int64))
+
+
+# Transition graph of every playdb session, ordered by order_of_song_played
+def build_transition_graph(dataset, top_k=DEFAULT_TOP_K):
+    playdb = dataset['playdb'].dropna(subset=['date'])
+    n_songs = len(dataset['song_registry']['keys'])
+    difficulty = np.full(n_songs, np.nan)
+    tabdb = dataset['tabdb']
+    difficulty[tabdb['song_id'].to_numpy()] = tabdb['difficulty'].to_numpy(dtype=float)
+
+    graph = new_transition_graph(n_songs, difficulty, top_k)
+    dates = playdb['date'].to_numpy()
+    order = np.lexsort((playdb['order_of_song_played'].to_numpy(), dates))
+    return add_sequences(graph, playdb['song_id'].to_numpy()[order], dates[order])
+
+
+# Transition graph of a dataset, built on first use and kept with the dataset
+def transition_graph(dataset):
+    if 'transition_graph' not in dataset:
+        dataset['transition_graph'] = build_transition_graph(dataset)
+    return dataset['transition_graph']
+
+
+# Songs that most often follow song_id, most frequent first, with their share of its transitions
+def what_follows(graph, song_id, registry=None):
+    following, counts, followed = np.array([], dtype=np.int64), np.array([], dtype=np.int64), 0
+    if song_id < len(graph['plays']):
+        kept = graph['top_following'][song_id] >= 0
+        following, counts = graph['top_following'][song_id][kept], graph['top_counts'][song_id][kept]
+        followed = graph['followed'][song_id]
+    result = pd.DataFrame({'song_id': following, 'transitions': counts, 'share': counts / max(followed, 1)})
+    if registry is not None:
+        result.insert(1, 'song', registry['songs'][following])
+        result.insert(2, 'artist', registry['artists'][following])
+    return result
+
+
+# Where song_id is usually played: mean position, mean position as a share of the session length
+# (1.0 is last), how often it opens or closes a session and the mean difficulty change to the next song
+def typical_position(graph, song_id):
+    plays = int(graph['plays'][song_id]) if song_id < len(graph['plays']) else 0
+    if not plays:
+        return {'plays': 0, 'mean_position': np.nan, 'mean_relative_position': np.nan,
+                'opener_rate': np.nan, 'closer_rate': np.nan, 'mean_next_difficulty_delta': np.nan}
+    delta_count = graph['delta_count'][song_id]
+    return {
+        'plays': plays,
+        'mean_position': graph['position_sum'][song_id] / plays,
+        'mean_relative_position': graph['relative_position_sum'][song_id] / plays,
+        'opener_rate': graph['openers'][song_id] / plays,
+        'closer_rate': graph['closers'][song_id] / plays,
+        'mean_next_difficulty_delta': graph['delta_sum'][song_id] / delta_count if delta_count else np.nan,
+    }
+
+
+# How often each played song opened and closed a session, most frequent openers first
+def opener_closer_frequencies(graph):
+    played = np.flatnonzero(graph['plays'])
+    plays = graph['plays'][played]
+    frequencies = pd.DataFrame({
+        'song_id': played,
+        'plays': plays,
+        'openers': graph['openers'][played],
+        'closers': graph['closers'][played],
+        'opener_rate': graph['openers'][played] / plays,
+        'closer_rate': graph['closers'][played] / plays,
+    })
+    return frequencies.sort_values(['openers', 'closers'], ascending=False, kind='stable').reset_index(drop=True)
+
+
+# Every observed song -> next song pair with its count and difficulty change (NaN when a difficulty is unknown)
+def difficulty_deltas(graph):
+    songs = graph['pair_keys'] >> KEY_SHIFT
+    next_songs = graph['pair_keys'] & KEY_MASK
+    return pd.DataFrame({
+        'song_id': songs,
+        'next_song_id': next_songs,
+        'transitions': graph['pair_counts'],
+        'difficulty_delta': graph['difficulty'][next_songs] - graph['difficulty'][songs],
+    })
+
+
+# Song -> next song counts as a scipy sparse matrix (rows are songs, columns the songs that followed)
+def to_sparse_matrix(graph):
+    try:
+        from scipy import sparse
+    except ImportError:
+        raise ValueError("The sparse matrix export needs the scipy package")
+    n_songs = len(graph['plays'])
+    return sparse.csr_matrix((graph['pair_counts'], (graph['pair_keys'] >> KEY_SHIFT, graph['pair_keys'] & KEY_MASK)),
+                             shape=(n_songs, n_songs))
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+# Columns of the validation report
+REPORT_COLUMNS = ['file', 'line', 'column', 'issue', 'value']
+
+# Columns the wide playdb/requestdb files must have
+REQUIRED_WIDE_COLUMNS = ['song', 'artist']
+
+# Codes allowed in requestdb cells
+VALID_REQUEST_CODES = ['G', 'A', '?']
+
+
+# Raised when the files cannot be loaded at all; carries the full report
+class DatasetValidationError(ValueError):
+    def __init__(self, report):
+        self.report = report
+        super().__init__(summarize_report(report))
+
+
+# Report rows for the given data row positions; line numbers count the header as line 1
+def issue_frame(file, rows, column, issue, values):
+    rows = np.asarray(rows, dtype=np.int64)
+    return pd.DataFrame({
+        'file': file,
+        'line': rows + 2,
+        'column': column,
+        'issue': issue,
+        'value': pd.Series(values, dtype=object).to_numpy() if len(rows) else np.array([], dtype=object),
+    })
+
+
+# Report problems that concern a whole file rather than a row
+def file_issue(file, column, issue):
+    return pd.DataFrame({'file': [file], 'line': [pd.NA], 'column': [column], 'issue': [issue], 'value': [None]})
+
+
+# Missing files and missing required columns of all three files
+def check_schema(file_paths, headers, required_columns):
+    issues = []
+    required = {'tabdb': required_columns, 'playdb': REQUIRED_WIDE_COLUMNS, 'requestdb': REQUIRED_WIDE_COLUMNS}
+    for name, path in file_paths.items():
+        if not path:
+            issues.append(file_issue(f"{name}.csv", None, "no file path provided"))
+            continue
+        if isinstance(headers.get(name), Exception):
+            issues.append(file_issue(f"{name}.csv", None, f"cannot read file: {headers[name]}"))
+            continue
+        for col in required.get(name, []):
+            if col not in headers[name]:
+                issues.append(file_issue(f"{name}.csv", col, "missing column"))
+    return issues
+
+
+# Cells that hold a value but did not parse; numeric columns are only masked, never turned into text
+def check_parsed(file, column, raw, parsed, issue, rows=None):
+    raw = pd.Series(raw)
+    present = raw.notna().to_numpy()
+    if not pd.api.types.is_numeric_dtype(raw.dtype):
+        present = present & (raw.astype(str).str.strip() != '').to_numpy()
+    failed = np.flatnonzero(present & pd.isna(np.asarray(parsed)))
+    rows = np.arange(len(raw)) if rows is None else np.asarray(rows)
+    if np.ndim(column):  # One column name per cell, as in the wide files
+        column = np.asarray(column, dtype=object)[failed]
+    return issue_frame(file, rows[failed], column, issue, raw.to_numpy()[failed])
+
+
+# Wide file date headers that are not yyyymmdd dates
+def check_date_headers(file, unparsed_columns):
+    return [file_issue(file, col, "unparseable date column") for col in unparsed_columns]
+
+
+# requestdb cells other than the G/A/? codes
+def check_request_codes(file, rows, columns, codes):
+    unknown = np.flatnonzero(~pd.Series(codes, dtype=object).isin(VALID_REQUEST_CODES).to_numpy())
+    return issue_frame(file, np.asarray(rows)[unknown], np.asarray(columns, dtype=object)[unknown],
+                       "unknown request code", np.asarray(codes, dtype=object)[unknown])
+
+
+# Songs played more than once on the same date
+def check_duplicate_plays(playdb):
+    duplicated = playdb.duplicated(subset=['song_id', 'date'], keep=False).to_numpy() & playdb['date'].notna().to_numpy()
+    duplicates = playdb[duplicated]
+    return issue_frame("playdb.csv", duplicates['source_row'], duplicates['source_column'],
+                       "duplicate play of a song on one date", duplicates['song'])
+
+
+# Songs in playdb/requestdb that tabdb does not know, one report row per song and file
+def check_orphans(dataset):
+    known = np.zeros(len(dataset['song_registry']['keys']), dtype=bool)
+    known[dataset['tabdb']['song_id'].to_numpy()] = True
+    issues = []
+    for name, file in (('playdb', "playdb.csv"), ('requestdb', "requestdb.csv")):
+        df = dataset[name]
+        orphans = df[~known[df['song_id'].to_numpy()]].drop_duplicates('song_id')
+        issues.append(issue_frame(file, orphans['source_row'], 'song', "song missing from tabdb", orphans['song']))
+    return issues
+
+
+# Combine issue frames into one report ordered by file and line
+def build_report(issues):
+    issues = [issue for issue in issues if len(issue)]
+    if not issues:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    report = pd.concat(issues, ignore_index=True)[REPORT_COLUMNS]
+    return report.sort_values(['file', 'line'], kind='stable', na_position='first').reset_index(drop=True)
+
+
+# Number of report rows per file and issue, as readable text
+def summarize_report(report):
+    if report.empty:
+        return "No problems found."
+    counts = report.groupby(['file', 'issue'], sort=False).size()
+    return "\n".join(f"{file}: {count} x {issue}" for (file, issue), count in counts.items())